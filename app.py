@@ -1,11 +1,16 @@
 
+import os
 import streamlit as st
 import pandas as pd
 from collections import defaultdict
+from mechid_antibiogram import M39_MIN_COUNT, antibiogram_table, cumulative_antibiogram, data_version
+from mechid_cohort import cohort_phenotypes
+from mechid_mdr import MDR_GROUPINGS, classify_cohort, mdr_counts
+from mechid_user_rules import USER_RULES, normalize_org_name
 
 st.set_page_config(page_title="Resistance Mechanism Predictor", page_icon="🧪", layout="centered")
 
-@st.cache_data
+@st.cache_resource
 def load_data():
     try:
         df = pd.read_csv("microbiology_cultures_cohort.csv")
@@ -19,100 +24,29 @@ def load_data():
 
 df = load_data()
 
+def cohort_data_version():
+    for path in ("microbiology_cultures_cohort.csv", "/mnt/data/microbiology_cultures_cohort.csv"):
+        if os.path.exists(path):
+            return data_version(path)
+    return "empty"
+
+@st.cache_data(show_spinner="Computing cumulative antibiogram...")
+def get_antibiogram(version, period, min_count, _df):
+    """Recomputed only when the cohort file (data version) or the parameters change."""
+    return cumulative_antibiogram(_df, period=period, min_count=min_count)
+
+@st.cache_data(show_spinner="Classifying MDR/XDR/PDR...")
+def get_mdr_classes(version, _df):
+    """Per-isolate Magiorakos classes; recomputed only when the cohort file changes."""
+    return classify_cohort(cohort_phenotypes(_df))
+
 st.title("🧪 Resistance Mechanism Predictor")
 st.caption("Select an organism and record susceptibilities for the tested antibiotics. The app applies intrinsic/cascade rules and suggests likely resistance mechanisms.")
 
-# Rules supplied by the user
-USER_RULES = {
-    "ACINETOBACTER": {
-        "intrinsic_resistance": ["Aztreonam", "Cefazolin", "Minocycline", "Tetracycline"],
-        "cascade": [
-            {"target": "Doripenem", "rule": "same_as", "ref": "Meropenem"},
-            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
-            {"target": "Cefotaxime", "rule": "same_as", "ref": "Ceftriaxone"},
-            {"target": "Ertapenem", "rule": "sus_if_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},  # treat as any_sus over 2 refs
-            {"target": "Imipenem", "rule": "sus_if_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Meropenem", "rule": "sus_if_any_sus", "refs": ["Imipenem", "Ceftriaxone", "Cefotaxime"]},
-        ],
-    },
-    "CITROBACTER": {
-        "intrinsic_resistance": ["Ampicillin", "Cefazolin", "Cefotetan", "Cefoxitin"],
-        "cascade": [
-            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-        ],
-    },
-    "Enterobacter": {
-        "intrinsic_resistance": ["Ampicillin", "Cefazolin"],
-        "cascade": [
-            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
-            {"target": "Cefotaxime", "rule": "same_as", "ref": "Ceftriaxone"},
-            {"target": "Doxycycline", "rule": "sus_if_sus_else_res", "ref": "Tetracycline"},
-            {"target": "Doripenem", "rule": "same_as", "ref": "Meropenem"},
-            {"target": "Ertapenem", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Imipenem", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
-            {"target": "Meropenem", "rule": "sus_if_any_sus", "refs": ["Imipenem", "Ceftriaxone", "Cefotaxime"]},
-        ],
-    },
-    "ESCHERICHIA COLI": {
-        "intrinsic_resistance": [],
-        "cascade": [
-            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime", "Cefazolin"]},
-            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime", "Cefazolin"]},
-            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
-            {"target": "Cefotetan", "rule": "sus_if_sus", "ref": "Cefazolin"},
-            {"target": "Cefoxitin", "rule": "sus_if_sus", "ref": "Cefazolin"},
-            {"target": "Cefpodoxime", "rule": "same_as_else_sus_if_sus", "primary": "Ceftriaxone", "fallback": "Cefazolin"},
-            {"target": "Cefuroxime", "rule": "sus_if_sus", "ref": "Cefazolin"},
-            {"target": "Doxycycline", "rule": "sus_if_sus_else_res", "ref": "Tetracycline"},
-        ],
-    },
-    "KLEBSIELLA": {
-        "intrinsic_resistance": ["Ampicillin"],
-        "cascade": [],
-    },
-    "Proteus species": {
-        "intrinsic_resistance": ["Tetracycline", "Tigecycline", "Colistin"],
-        "cascade": [],
-    },
-    "Pseudomonas aeruginosa": {
-        "intrinsic_resistance": ["Ampicillin", "Ceftriaxone", "Cefazolin", "Ertapenem", "Tetracycline", "Tigecycline"],
-        "cascade": [],
-    },
-    "Serratia": {
-        "intrinsic_resistance": ["Ampicillin", "Cefazolin", "Tetracycline"],
-        "cascade": [],
-    },
-}
-
 ENTEROBACTERALES = {"ESCHERICHIA COLI", "KLEBSIELLA", "Enterobacter", "CITROBACTER", "Serratia", "Proteus species"}
 CARBAPENEMS = {"Imipenem", "Meropenem", "Ertapenem", "Doripenem"}
 THIRD_GENS = {"Ceftriaxone", "Cefotaxime", "Ceftazidime", "Cefpodoxime"}
 
-def normalize_org_name(name: str) -> str:
-    if pd.isna(name):
-        return name
-    n = name.strip()
-    if n.upper().startswith("ACINETOBACTER"):
-        return "ACINETOBACTER"
-    if n.upper().startswith("CITROBACTER"):
-        return "CITROBACTER"
-    if n.upper().startswith("ESCHERICHIA"):
-        return "ESCHERICHIA COLI"
-    if n.upper().startswith("KLEBSIELLA"):
-        return "KLEBSIELLA"
-    if n.upper().startswith("ENTEROBACTER"):
-        return "Enterobacter"
-    if n.upper().startswith("SERRATIA"):
-        return "Serratia"
-    if n.upper().startswith("PSEUDOMONAS"):
-        return "Pseudomonas aeruginosa"
-    if n.upper().startswith("PROTEUS"):
-        return "Proteus species"
-    return n
-
 def apply_cascade_rules(org_rules, inputs):
     inferred = {}
     def get_status(ab):
@@ -182,8 +116,19 @@ def infer_mechanisms(organism, final_results):
 
     return mechs
 
+@st.cache_resource
+def load_cohort_index():
+    """Normalized organism -> antibiotics seen in the cohort, shared by all sessions."""
+    if df.empty or "organism" not in df.columns or "antibiotic" not in df.columns:
+        return {}
+    pairs = df[["organism", "antibiotic"]].dropna().drop_duplicates()
+    org_keys = pairs["organism"].map({o: normalize_org_name(o) for o in pairs["organism"].unique()})
+    return {k: sorted(abs_) for k, abs_ in pairs["antibiotic"].groupby(org_keys).unique().items()}
+
+cohort_index = load_cohort_index()
+
 # Build organism list from data + rules
-org_from_data = sorted({normalize_org_name(o) for o in df["organism"].dropna().unique()}) if "organism" in df.columns else []
+org_from_data = sorted(cohort_index)
 org_from_rules = sorted(USER_RULES.keys())
 organisms = sorted(set(org_from_data) | set(org_from_rules))
 
@@ -193,9 +138,7 @@ org_key = normalize_org_name(organism)
 org_rules = USER_RULES.get(org_key, {"intrinsic_resistance": [], "cascade": []})
 
 # Antibiotics options from data and rules for the organism
-ab_from_data = []
-if not df.empty and "organism" in df.columns and "antibiotic" in df.columns:
-    ab_from_data = sorted(df[df["organism"].apply(lambda x: normalize_org_name(x) == org_key)]["antibiotic"].dropna().unique())
+ab_from_data = cohort_index.get(org_key, [])
 ab_from_rules = sorted({r["target"] for r in org_rules.get("cascade", [])})
 ab_options = sorted(set(ab_from_data) | set(ab_from_rules))
 
@@ -255,3 +198,38 @@ else:
     st.success("No major resistance mechanism identified based on current inputs.")
 
 st.caption("Heuristic output; confirm with phenotypic/molecular tests per your lab policy.")
+
+# Cumulative antibiogram (CLSI M39 style) from the cohort
+if not df.empty:
+    with st.expander("Cumulative antibiogram (first isolate per patient, %S)"):
+        period_kind = st.selectbox("Period", ["Y", "Q", "M", "all"], format_func={
+            "Y": "Calendar year", "Q": "Quarter", "M": "Month", "all": "All data"}.get)
+        min_count = st.number_input("Minimum isolates per cell", min_value=1, value=M39_MIN_COUNT)
+        abg = get_antibiogram(cohort_data_version(), period_kind, int(min_count), df)
+        if abg.empty:
+            st.caption("No interpretable susceptibility rows in the cohort.")
+        else:
+            periods = sorted(abg["period"].unique(), reverse=True)
+            period = st.selectbox("Show period", periods)
+            st.dataframe(antibiogram_table(abg, period), use_container_width=True)
+            st.caption(f"Cells with fewer than {int(min_count)} isolates are suppressed (—). 95% Wilson intervals are in the CSV.")
+            st.download_button("Download antibiogram (CSV)", abg.to_csv(index=False),
+                               file_name="cumulative_antibiogram.csv", mime="text/csv")
+
+    with st.expander("MDR / XDR / PDR (Magiorakos 2012)"):
+        mdr_by = st.multiselect("Group by", list(MDR_GROUPINGS), default=["organism"])
+        mdr_period = st.selectbox("Period", ["M", "Q", "Y", "all"], key="mdr_period", format_func={
+            "Y": "Calendar year", "Q": "Quarter", "M": "Month", "all": "All data"}.get)
+        try:
+            classified = get_mdr_classes(cohort_data_version(), df)
+        except ValueError as exc:
+            st.caption(f"MDR classification needs isolate-level rows: {exc}")
+        else:
+            if not mdr_by or (classified["mdr_class"] == "").all():
+                st.caption("Choose at least one grouping; only Enterobacterales, P. aeruginosa, Acinetobacter, S. aureus and enterococci are classified.")
+            else:
+                counts = mdr_counts(classified, mdr_by, period=mdr_period)
+                st.dataframe(counts, use_container_width=True, hide_index=True)
+                st.caption("First isolate per patient per organism; XDR/PDR are relative to the agents on the reported panel.")
+                st.download_button("Download MDR counts (CSV)", counts.to_csv(index=False),
+                                   file_name="mdr_counts.csv", mime="text/csv")
@@ -0,0 +1,364 @@
+"""
+Cumulative antibiogram (CLSI M39 style) over the long cohort table.
+
+    python mechid_antibiogram.py --cohort microbiology_cultures_cohort.csv --period Y --min-count 30 --out antibiogram.csv
+    python mechid_antibiogram.py --cohort todays_rows.csv --state antibiogram_state.pkl --window 12
+
+  - first isolate per patient per organism per period (earliest collection,
+    regardless of susceptibility profile);
+  - %S = susceptible / tested for each period x organism x antibiotic, with a
+    95% Wilson score interval;
+  - cells with fewer than --min-count isolates (M39: 30) keep their counts but
+    have %S and the interval suppressed.
+
+Organism, antibiotic and result columns are factorized to integer codes and the
+counts are one np.bincount over the combined (period, organism, antibiotic,
+result) code. Results are cached per data version (file size + mtime, or any
+caller-supplied token) and parameters.
+"""
+import argparse
+import functools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, per_unique
+from mechid_dedup import first_isolate_flags
+from mechid_engine import normalize_antibiotic, normalize_org, normalize_result
+
+M39_MIN_COUNT = 30
+WILSON_Z = 1.959964
+PERIODS = ("Y", "Q", "M", "all")
+
+
+def wilson_interval(successes, n, z=WILSON_Z):
+    """Vectorized Wilson score interval; NaN where n == 0."""
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = successes / n
+        denom = 1 + z * z / n
+        centre = (p + z * z / (2 * n)) / denom
+        half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return centre - half, centre + half
+
+
+def data_version(path):
+    st = os.stat(path)
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def period_labels(collected, period="Y"):
+    # integer period keys, formatted once per distinct period (strftime per row is slow)
+    ts = pd.to_datetime(collected, errors="coerce")
+    if period == "all":
+        return pd.Series("all", index=ts.index)
+    year = ts.dt.year
+    if period == "Y":
+        key, fmt = year, lambda k: f"{int(k)}"
+    elif period == "Q":
+        key, fmt = year * 10 + ts.dt.quarter, lambda k: f"{int(k) // 10}-Q{int(k) % 10}"
+    else:
+        key, fmt = year * 100 + ts.dt.month, lambda k: f"{int(k) // 100}-{int(k) % 100:02d}"
+    return pd.Series(per_unique(key, fmt, "unknown"), index=ts.index)
+
+
+def _org_name(name):
+    return normalize_org(str(name).strip())
+
+
+def _ab_name(name):
+    return normalize_antibiotic(name) or str(name).strip()
+
+
+def _result_letter(value):
+    try:
+        return {"Susceptible": "S", "Intermediate": "I", "Resistant": "R"}.get(normalize_result(value), "")
+    except ValueError:
+        return ""
+
+
+def normalized_results(long, columns=None, period="Y"):
+    """
+    Long cohort -> tidy rows with normalized organism/antibiotic/result plus
+    patient, collected timestamp, isolate key and period label.
+    """
+    cols = columns or cohort_columns()
+    out = pd.DataFrame({
+        "organism": per_unique(long[cols["organism"]], _org_name),
+        "antibiotic": per_unique(long[cols["antibiotic"]], _ab_name),
+        "result": per_unique(long[cols["result"]], _result_letter, ""),
+    }, index=long.index)
+    out["patient"] = long[cols["patient"]].astype(str) if cols["patient"] in long else "unknown"
+    collected = long[cols["collected"]] if cols["collected"] in long else pd.Series(pd.NaT, index=long.index)
+    out["collected"] = pd.to_datetime(collected, errors="coerce")
+    keys = [c for c in cols["isolate"] if c in long]
+    if keys:
+        out["isolate"] = long[keys[0]].astype(str).str.cat([long[k].astype(str) for k in keys[1:]], sep="|") \
+            if len(keys) > 1 else long[keys[0]].astype(str)
+    else:
+        out["isolate"] = out["patient"] + "|" + out["collected"].astype(str)
+    # one culture can grow several organisms under the same accession
+    out["isolate"] = out["isolate"] + "|" + out["organism"].astype(str)
+    out["period"] = period_labels(out["collected"], period)
+    out = out[(out["result"] != "") & out["organism"].notna()]
+    # an isolate counts once per antibiotic; a repeated row replaces the earlier one
+    return out.drop_duplicates(["isolate", "antibiotic"], keep="last")
+
+
+def first_isolate_mask(rows):
+    """
+    Boolean mask over `rows` keeping every result of the first isolate per
+    (patient, organism, period); ties on collection time go to the lower
+    isolate key (mechid_dedup.first_isolate_flags, no episode window).
+    """
+    iso = rows[["patient", "organism", "period", "collected", "isolate"]].drop_duplicates("isolate")
+    iso = iso.sort_values("isolate", kind="stable")
+    first = iso.loc[first_isolate_flags(iso, "patient", "organism", "collected", period="period"), "isolate"]
+    return rows["isolate"].isin(first).to_numpy()
+
+
+def count_cells(rows):
+    """S/I/R counts per (period, organism, antibiotic) via one bincount over combined codes."""
+    period_codes, periods = pd.factorize(rows["period"], sort=True)
+    org_codes, orgs = pd.factorize(rows["organism"], sort=True)
+    ab_codes, abs_ = pd.factorize(rows["antibiotic"], sort=True)
+    res_codes = pd.Categorical(rows["result"], categories=["S", "I", "R"]).codes
+    shape = (len(periods), len(orgs), len(abs_), 3)
+    flat = np.ravel_multi_index((period_codes, org_codes, ab_codes, res_codes), shape)
+    counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(-1, 3)
+    cells = np.flatnonzero(counts.sum(axis=1))
+    p_idx, o_idx, a_idx = np.unravel_index(cells, shape[:3])
+    return pd.DataFrame({
+        "period": np.asarray(periods, dtype=object)[p_idx],
+        "organism": np.asarray(orgs, dtype=object)[o_idx],
+        "antibiotic": np.asarray(abs_, dtype=object)[a_idx],
+        "n_S": counts[cells, 0],
+        "n_I": counts[cells, 1],
+        "n_R": counts[cells, 2],
+    })
+
+
+def summarize_counts(counts, min_count=M39_MIN_COUNT):
+    """Add n_tested, %S, Wilson interval and suppression to S/I/R count rows."""
+    n = (counts["n_S"] + counts["n_I"] + counts["n_R"]).to_numpy()
+    s = counts["n_S"].to_numpy()
+    low, high = wilson_interval(s, n)
+    suppressed = n < min_count
+    out = counts.copy()
+    out.insert(out.columns.get_loc("n_S"), "n_tested", n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["pct_S"] = np.where(suppressed, np.nan, np.round(100 * s / n, 1))
+    out["ci_low"] = np.where(suppressed, np.nan, np.round(100 * low, 1))
+    out["ci_high"] = np.where(suppressed, np.nan, np.round(100 * high, 1))
+    out["suppressed"] = suppressed
+    return out
+
+
+@functools.lru_cache(maxsize=16)
+def _cached(version, path, columns_key, period, min_count, first_isolate):
+    long = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    return cumulative_antibiogram(long, dict(columns_key), period, min_count, first_isolate)
+
+
+def cumulative_antibiogram(long, columns=None, period="Y", min_count=M39_MIN_COUNT, first_isolate=True):
+    """
+    Returns:
+      DataFrame: period, organism, antibiotic, n_tested, n_S, n_I, n_R, pct_S,
+      ci_low, ci_high, suppressed (one row per tested combination)
+    """
+    rows = normalized_results(long, columns, period)
+    if first_isolate:
+        rows = rows[first_isolate_mask(rows)]
+    return summarize_counts(count_cells(rows), min_count)
+
+
+def antibiogram_for_file(path=COHORT_PATH, columns=None, period="Y", min_count=M39_MIN_COUNT, first_isolate=True):
+    """File-backed antibiogram, recomputed only when the file's data version changes."""
+    cols = columns or cohort_columns()
+    columns_key = tuple(sorted((k, tuple(v) if isinstance(v, tuple) else v) for k, v in cols.items()))
+    return _cached(data_version(path), path, columns_key, period, min_count, first_isolate)
+
+
+# ======================
+# Incremental maintenance (monthly aggregates + first-isolate state)
+# ======================
+_KEY = ["patient", "organism", "period"]
+_CELL = ["period", "organism", "antibiotic"]
+_NO_DATE = pd.Timestamp.max
+
+
+class IncrementalAntibiogram:
+    """
+    Monthly S/I/R aggregates kept up to date as cohort rows arrive.
+
+    State:
+      counts      n_S/n_I/n_R per (month, organism, antibiotic)
+      first       current first isolate per (patient, organism, month)
+      first_rows  that isolate's result per antibiotic (needed to retract it)
+
+    apply() turns a batch of new long rows into count deltas: rows of a current
+    first isolate are added (replacing an earlier result for the same drug), an
+    isolate collected earlier than the current first replaces it (its rows are
+    subtracted), anything later is ignored. The result equals a full recompute
+    with period="M". Windows (e.g. the last 12 months) are sums of monthly
+    aggregates; a window moved forward adds the new months and subtracts the
+    expired ones instead of re-summing.
+    """
+
+    def __init__(self, columns=None, min_count=M39_MIN_COUNT):
+        self.columns = columns or cohort_columns()
+        self.min_count = min_count
+        self.counts = pd.DataFrame(columns=["n_S", "n_I", "n_R"], index=pd.MultiIndex.from_tuples([], names=_CELL))
+        self.first = pd.DataFrame(columns=["collected", "isolate"], index=pd.MultiIndex.from_tuples([], names=_KEY))
+        self.first_rows = pd.DataFrame(columns=["period", "organism", "antibiotic", "result", "isolate"])
+        self._window = None  # (end month, months, totals)
+
+    @staticmethod
+    def _cells(rows):
+        if rows.empty:
+            return pd.DataFrame(columns=["n_S", "n_I", "n_R"], index=pd.MultiIndex.from_tuples([], names=_CELL))
+        return count_cells(rows).set_index(_CELL)
+
+    def apply(self, long):
+        """Fold new long cohort rows into the aggregates; returns the count delta."""
+        rows = normalized_results(long, self.columns, period="M")
+        if rows.empty:
+            return self._cells(rows)
+        # earliest isolate per key within the batch
+        cand = rows.drop_duplicates("isolate")[_KEY + ["collected", "isolate"]]
+        cand = cand.assign(collected=cand["collected"].fillna(_NO_DATE))
+        cand = cand.sort_values(_KEY + ["collected", "isolate"], kind="stable").drop_duplicates(_KEY)
+        cur = self.first.reindex(pd.MultiIndex.from_frame(cand[_KEY]))
+        cur_collected = pd.to_datetime(cur["collected"]).to_numpy()
+        cur_isolate = cur["isolate"].to_numpy()
+        new_collected, new_isolate = cand["collected"].to_numpy(), cand["isolate"].to_numpy()
+        is_new = pd.isna(cur_isolate)
+        earlier = ~is_new & (
+            (new_collected < cur_collected)
+            | ((new_collected == cur_collected) & (new_isolate.astype(str) < cur_isolate.astype(str)))
+        )
+        winners = cand[is_new | earlier]
+        replaced = set(cur_isolate[earlier])
+
+        current = self.first["isolate"]
+        keep_current = current[~current.isin(replaced)]
+        accepted = rows[rows["isolate"].isin(winners["isolate"]) | rows["isolate"].isin(keep_current)]
+        accepted = accepted[["period", "organism", "antibiotic", "result", "isolate"]]
+
+        fr = self.first_rows
+        overwritten = pd.MultiIndex.from_frame(fr[["isolate", "antibiotic"]]).isin(
+            pd.MultiIndex.from_frame(accepted[["isolate", "antibiotic"]])
+        ) if len(fr) else np.zeros(0, dtype=bool)
+        removed_mask = fr["isolate"].isin(replaced).to_numpy() | overwritten
+        removed = fr[removed_mask]
+
+        delta = self._cells(accepted).sub(self._cells(removed), fill_value=0)
+        self.counts = self.counts.add(delta, fill_value=0).astype(int)
+        self.counts = self.counts[(self.counts != 0).any(axis=1)]
+        self.first_rows = pd.concat([x for x in (fr[~removed_mask], accepted) if len(x)], ignore_index=True)
+        self.first = pd.concat([x for x in (
+            self.first[~self.first["isolate"].isin(replaced)],
+            winners.set_index(_KEY)[["collected", "isolate"]],
+        ) if len(x)])
+        self.first = self.first[~self.first.index.duplicated(keep="last")]
+        if self._window is not None:
+            end, months, totals = self._window
+            in_window = self._months_in(delta, end, months)
+            self._window = (end, months, totals.add(
+                delta[in_window].groupby(level=["organism", "antibiotic"]).sum(), fill_value=0))
+        return delta
+
+    @staticmethod
+    def _months_in(frame, end, months):
+        period = frame.index.get_level_values("period")
+        start = (pd.Period(end, "M") - (months - 1)).strftime("%Y-%m")
+        return (period >= start) & (period <= end)
+
+    def _sum_periods(self, mask):
+        return self.counts[mask].groupby(level=["organism", "antibiotic"]).sum()
+
+    def window_counts(self, end, months=12):
+        """S/I/R totals per (organism, antibiotic) over the `months` months ending at `end` (YYYY-MM)."""
+        if self._window is not None and self._window[1] == months and self._window[0] <= end:
+            prev_end, _, totals = self._window
+            period = self.counts.index.get_level_values("period")
+            entering = (period > prev_end) & (period <= end)
+            prev_start = (pd.Period(prev_end, "M") - (months - 1)).strftime("%Y-%m")
+            new_start = (pd.Period(end, "M") - (months - 1)).strftime("%Y-%m")
+            expired = (period >= prev_start) & (period < new_start)
+            totals = totals.add(self._sum_periods(entering), fill_value=0).sub(self._sum_periods(expired), fill_value=0)
+        else:
+            totals = self._sum_periods(self._months_in(self.counts, end, months))
+        totals = totals[(totals != 0).any(axis=1)].astype(int)
+        self._window = (end, months, totals)
+        return totals
+
+    def table(self, end=None, months=12):
+        """Summarized antibiogram for a rolling window (default: ending at the latest month)."""
+        periods = self.counts.index.get_level_values("period")
+        known = periods[periods != "unknown"]
+        if end is None:
+            if not len(known):
+                return summarize_counts(pd.DataFrame(columns=["period", "organism", "antibiotic", "n_S", "n_I", "n_R"]))
+            end = known.max()
+        totals = self.window_counts(end, months).reset_index()
+        start = (pd.Period(end, "M") - (months - 1)).strftime("%Y-%m")
+        totals.insert(0, "period", f"{start}..{end}")
+        return summarize_counts(totals, self.min_count)
+
+    def save(self, path):
+        pd.to_pickle({"columns": self.columns, "min_count": self.min_count, "counts": self.counts,
+                      "first": self.first, "first_rows": self.first_rows}, path)
+
+    @classmethod
+    def load(cls, path):
+        state = pd.read_pickle(path)
+        obj = cls(state["columns"], state["min_count"])
+        obj.counts, obj.first, obj.first_rows = state["counts"], state["first"], state["first_rows"]
+        return obj
+
+
+def antibiogram_table(result, period=None):
+    """Organism x antibiotic display table of "%S (n)" ("— (n)" when suppressed)."""
+    if period is not None:
+        result = result[result["period"] == period]
+    cell = np.where(
+        result["suppressed"],
+        "— (" + result["n_tested"].astype(str) + ")",
+        result["pct_S"].map("{:.0f}".format) + " (" + result["n_tested"].astype(str) + ")",
+    )
+    return result.assign(cell=cell).pivot_table(
+        index="organism", columns="antibiotic", values="cell", aggfunc="first"
+    ).fillna("")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cumulative antibiogram (CLSI M39 style)")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--period", choices=PERIODS, default="Y")
+    parser.add_argument("--min-count", type=int, default=M39_MIN_COUNT)
+    parser.add_argument("--all-isolates", action="store_true", help="skip first-isolate deduplication")
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--state", default=None, help="incremental state file: apply --cohort as new rows")
+    parser.add_argument("--window", type=int, default=12, help="rolling window in months (with --state)")
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args(argv)
+    if args.state:
+        columns = cohort_columns(isolate=args.isolate_cols)
+        inc = IncrementalAntibiogram.load(args.state) if os.path.exists(args.state) else \
+            IncrementalAntibiogram(columns, args.min_count)
+        inc.apply(pd.read_csv(args.cohort, dtype=str, keep_default_na=False, na_values=[""]))
+        inc.save(args.state)
+        inc.table(months=args.window).to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+        return
+    result = antibiogram_for_file(
+        args.cohort, cohort_columns(isolate=args.isolate_cols), args.period, args.min_count, not args.all_isolates
+    )
+    result.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
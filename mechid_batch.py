@@ -0,0 +1,187 @@
+"""
+Resumable cohort backfill.
+
+    python mechid_batch.py --cohort microbiology_cultures_cohort.csv --work backfill_work --out cohort_interpreted.csv
+
+Three phases, all restartable from <work>/checkpoint.json:
+  1. split   : the cohort CSV is streamed in --chunk-rows chunks and every row is
+               appended to spill/part-NNNNN.csv by a hash of its isolate key, so
+               all rows of an isolate land in one partition. After each chunk the
+               spill files are fsynced and the checkpoint records the source row
+               offset and every spill file's size; on resume the spill files are
+               truncated back to those sizes and reading restarts at that row.
+  2. process : each partition is turned into phenotypes, interpreted, and written
+               to parts/part-NNNNN.csv (temp file + rename); finished partition
+               IDs are recorded and never recomputed.
+  3. merge   : parts are concatenated in partition order into --out.
+
+Rows reach each spill file in source order whether or not the run was
+interrupted, so the merged output is byte-identical to an uninterrupted run.
+The checkpoint stores the engine's rules_version(), the source file's size and
+mtime, the cohort column mapping and the therapy context (--syndrome/--severity);
+resuming with a different engine, source or options is refused (use --restart).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, _isolate_keys, cohort_columns, cohort_phenotypes, interpret_matrix
+from mechid_engine import rules_version
+from mechid_watch import atomic_write, load_checkpoint, save_checkpoint
+
+PARTITIONS = 64
+CHUNK_ROWS = 200_000
+
+
+def _part_name(p):
+    return f"part-{p:05d}.csv"
+
+
+def _fingerprint(source, partitions, columns, tx_context=None):
+    st = os.stat(source)
+    return {
+        "rules_version": rules_version(),
+        "source": os.path.abspath(source),
+        "source_size": st.st_size,
+        "source_mtime": st.st_mtime,
+        "partitions": partitions,
+        "columns": {k: list(v) if isinstance(v, tuple) else v for k, v in columns.items()},
+        "tx_context": dict(tx_context or {}),
+    }
+
+
+def _open_checkpoint(work, fingerprint, restart):
+    path = os.path.join(work, "checkpoint.json")
+    state = load_checkpoint(path)
+    if state and restart:
+        shutil.rmtree(work)
+        state = {}
+    if state and state["fingerprint"] != fingerprint:
+        raise ValueError(
+            "Checkpoint was written for a different engine/source/partitioning/columns/context; rerun with --restart"
+        )
+    os.makedirs(os.path.join(work, "spill"), exist_ok=True)
+    os.makedirs(os.path.join(work, "parts"), exist_ok=True)
+    if not state:
+        state = {"fingerprint": fingerprint, "rows_split": 0, "spill_sizes": {}, "split_done": False, "done": []}
+        save_checkpoint(path, state)
+    return path, state
+
+
+def _split(source, work, state, checkpoint_path, columns, chunk_rows):
+    partitions = state["fingerprint"]["partitions"]
+    spill_dir = os.path.join(work, "spill")
+    # undo anything written after the last checkpoint
+    for name in os.listdir(spill_dir):
+        size = state["spill_sizes"].get(name, 0)
+        with open(os.path.join(spill_dir, name), "r+b") as fh:
+            fh.truncate(size)
+    reader = pd.read_csv(
+        source, dtype=str, keep_default_na=False, na_values=[""], chunksize=chunk_rows,
+        skiprows=range(1, state["rows_split"] + 1),
+    )
+    for chunk in reader:
+        # same isolate definition as the cohort loader (patient + collected fallback)
+        keys = _isolate_keys([c for c in columns["isolate"] if c in chunk.columns], columns, chunk)
+        part = pd.util.hash_pandas_object(chunk[keys], index=False).to_numpy() % partitions
+        for p, idx in pd.Series(range(len(chunk))).groupby(part).indices.items():
+            name = _part_name(int(p))
+            path = os.path.join(spill_dir, name)
+            with open(path, "ab") as fh:
+                chunk.iloc[idx].to_csv(fh, header=fh.tell() == 0, index=False)
+                fh.flush()
+                os.fsync(fh.fileno())
+            state["spill_sizes"][name] = os.path.getsize(path)
+        state["rows_split"] += len(chunk)
+        save_checkpoint(checkpoint_path, state)
+        print(f"split: {state['rows_split']} rows", file=sys.stderr, flush=True)
+    state["split_done"] = True
+    save_checkpoint(checkpoint_path, state)
+
+
+def _process(work, state, checkpoint_path, columns, tx_context):
+    for p in range(state["fingerprint"]["partitions"]):
+        if p in state["done"]:
+            continue
+        spill = os.path.join(work, "spill", _part_name(p))
+        if os.path.exists(spill) and os.path.getsize(spill):
+            long = pd.read_csv(spill, dtype=str, keep_default_na=False, na_values=[""])
+            result = interpret_matrix(cohort_phenotypes(long, columns), tx_context)
+        else:
+            result = pd.DataFrame()
+        atomic_write(os.path.join(work, "parts", _part_name(p)), result.to_csv(index=False).encode("utf-8"))
+        state["done"].append(p)
+        save_checkpoint(checkpoint_path, state)
+        print(f"process: partition {p} ({len(result)} isolates)", file=sys.stderr, flush=True)
+
+
+def _merge(work, partitions, out):
+    tmp = f"{out}.tmp"
+    header_written = False
+    with open(tmp, "wb") as dst:
+        for p in range(partitions):
+            with open(os.path.join(work, "parts", _part_name(p)), "rb") as src:
+                header = src.readline()
+                if not header.strip():
+                    continue
+                if not header_written:
+                    dst.write(header)
+                    header_written = True
+                shutil.copyfileobj(src, dst)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, out)
+
+
+def backfill(source=COHORT_PATH, work="backfill_work", out="cohort_interpreted.csv",
+             partitions=PARTITIONS, chunk_rows=CHUNK_ROWS, columns=None, tx_context=None, restart=False):
+    """Run (or resume) a full cohort backfill; returns summary stats."""
+    columns = columns or cohort_columns()
+    t0 = time.perf_counter()
+    checkpoint_path, state = _open_checkpoint(work, _fingerprint(source, partitions, columns, tx_context), restart)
+    resumed = {"rows_split": state["rows_split"], "partitions_done": len(state["done"])}
+    if not state["split_done"]:
+        _split(source, work, state, checkpoint_path, columns, chunk_rows)
+    _process(work, state, checkpoint_path, columns, tx_context)
+    _merge(work, partitions, out)
+    return {
+        "rows": state["rows_split"],
+        "partitions": partitions,
+        "resumed_from": resumed,
+        "rules_version": state["fingerprint"]["rules_version"],
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumable MechID cohort backfill")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--work", default="backfill_work")
+    parser.add_argument("--out", default="cohort_interpreted.csv")
+    parser.add_argument("--partitions", type=int, default=PARTITIONS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--isolate-cols", default=None, help="comma-separated isolate key columns")
+    parser.add_argument("--organism-col", default=None)
+    parser.add_argument("--antibiotic-col", default=None)
+    parser.add_argument("--result-col", default=None)
+    parser.add_argument("--syndrome", default=None)
+    parser.add_argument("--severity", default=None)
+    parser.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+    args = parser.parse_args(argv)
+    columns = cohort_columns(
+        isolate=args.isolate_cols, organism=args.organism_col, antibiotic=args.antibiotic_col, result=args.result_col
+    )
+    ctx = None
+    if args.syndrome or args.severity:
+        ctx = {"syndrome": args.syndrome or "Not specified", "severity": args.severity or "Not specified"}
+    stats = backfill(args.cohort, args.work, args.out, args.partitions, args.chunk_rows, columns, ctx, args.restart)
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Cascade rules against the cohort: mining candidate implications and validating
+the existing ones.
+
+    python mechid_cascade.py mine --cohort microbiology_cultures_cohort.csv --min-support 30 --out candidates.csv
+    python mechid_cascade.py validate --cohort microbiology_cultures_cohort.csv --out report.csv \\
+        --isolates-out contradictions.csv
+
+Every ordered pair of panel agents (target B, reference A) of every organism in
+the cohort is scored as two candidate rules, in the RULES cascade vocabulary:
+
+  sus_if_sus  A S => B S       premise: A S and B tested; counterexample: B I/R
+  same_as     B reported as A  premise: both tested;      counterexample: B != A
+
+support is the premise count, confidence = holds / premise with a 95% Wilson
+lower bound (ci_low) used for ranking, and baseline_S is B's overall %S so
+uninformative rules (B almost always S anyway) stand out. Candidates already
+present in RULES are marked; recommendation is
+
+  add       not in RULES, support >= --min-support, ci_low >= --min-confidence
+  keep      in RULES and ci_low >= --min-confidence
+  review    in RULES, confidence below --min-confidence (counterexamples)
+  -         too little support or not confident enough to suggest
+
+validate checks every cascade rule of RULES (engine) and USER_RULES (app.py,
+matched to cohort organisms through normalize_org_name) against the reported
+results, one rule at a time (no chaining through inferred values):
+
+  same_as                  both reported, target differs from ref
+  sus_if_sus(_any_sus)     a ref reported S, target reported I/R
+  sus_if_sus_else_res      both reported, S vs non-S disagreement
+  same_as_else_sus_if_sus  primary reported and differs, or primary not
+                           reported, fallback S and target I/R
+
+Rules naming agents that are not on the organism's panel are listed with the
+missing agents and are only partly (or not) applicable. The contradicting
+isolates of each report row are kept as an index bitmap (CohortIndex.select).
+
+Counts are popcounts of ANDed per-(organism, agent, result) bitsets from the
+cohort bitmap index (mechid_index), so all pairs of all panels take a few
+hundred thousand big-int operations and the validation report a few hundred.
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from mechid_antibiogram import M39_MIN_COUNT, wilson_interval
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_engine import ORGANISM_PANELS, RULES, _organism_intrinsic
+from mechid_index import CohortIndex
+from mechid_user_rules import USER_RULES, normalize_org_name
+
+MIN_CONFIDENCE = 0.95
+MINED_RULES = ("sus_if_sus", "same_as")
+NO_RESULTS = {"S": 0, "I": 0, "R": 0, "NS": 0, "T": 0}
+
+
+def result_bitsets(index, org):
+    """Per panel agent: {"S", "I", "R", "NS", "T"} bitsets restricted to the organism."""
+    org_bits = index.bitmap("organism", org)
+    out = {}
+    for ab in ORGANISM_PANELS[org]:
+        bits = {code: index.bitmap("result", ab, code) & org_bits for code in "SIR"}
+        bits["NS"] = bits["I"] | bits["R"]
+        bits["T"] = bits["S"] | bits["NS"]
+        if bits["T"]:
+            out[ab] = bits
+    return out
+
+
+def rule_pairs(rule):
+    """Expand one cascade rule into (mined rule kind, target, ref) pairs."""
+    target, kind = rule["target"], rule["rule"]
+    refs = rule.get("refs") or ([rule["ref"]] if "ref" in rule else [])
+    if kind in ("sus_if_sus", "sus_if_any_sus"):
+        return [("sus_if_sus", target, ref) for ref in refs]
+    if kind in ("same_as", "sus_if_sus_else_res"):
+        return [("same_as", target, ref) for ref in refs]
+    if kind == "same_as_else_sus_if_sus":
+        return [("same_as", target, rule["primary"]), ("sus_if_sus", target, rule["fallback"])]
+    return []
+
+
+def _pair_counts(kind, bits_b, bits_a):
+    if kind == "sus_if_sus":
+        premise = (bits_a["S"] & bits_b["T"]).bit_count()
+        holds = (bits_a["S"] & bits_b["S"]).bit_count()
+    else:
+        premise = (bits_a["T"] & bits_b["T"]).bit_count()
+        holds = sum((bits_a[c] & bits_b[c]).bit_count() for c in "SIR")
+    return premise, holds
+
+
+def mine_cascades(index, organisms=None, min_support=M39_MIN_COUNT, min_confidence=MIN_CONFIDENCE, rules=None):
+    """
+    Returns:
+      DataFrame: organism, rule, target, ref, support, holds, counterexamples,
+      confidence, ci_low, baseline_S, existing, recommendation (ranked by
+      organism, then ci_low and support)
+    """
+    rules = RULES if rules is None else rules
+    present = sorted(org for (kind, *rest) in index.bitmaps if kind == "organism" for org in rest)
+    out = []
+    for org in organisms or present:
+        if org not in ORGANISM_PANELS:
+            continue
+        existing = {pair for rule in rules.get(org, {}).get("cascade", []) for pair in rule_pairs(rule)}
+        intrinsic = _organism_intrinsic(org)
+        bits = {ab: b for ab, b in result_bitsets(index, org).items() if ab not in intrinsic}
+        for target, bits_b in bits.items():
+            n_tested = bits_b["T"].bit_count()
+            baseline = bits_b["S"].bit_count() / n_tested
+            for ref, bits_a in bits.items():
+                if ref == target:
+                    continue
+                for kind in MINED_RULES:
+                    premise, holds = _pair_counts(kind, bits_b, bits_a)
+                    if premise or (kind, target, ref) in existing:
+                        out.append((org, kind, target, ref, premise, holds, baseline, (kind, target, ref) in existing))
+    frame = pd.DataFrame(out, columns=["organism", "rule", "target", "ref", "support", "holds", "baseline_S", "existing"])
+    frame.insert(frame.columns.get_loc("holds") + 1, "counterexamples", frame["support"] - frame["holds"])
+    frame.insert(frame.columns.get_loc("counterexamples") + 1, "confidence",
+                 (frame["holds"] / frame["support"].where(frame["support"] > 0)).round(4))
+    frame.insert(frame.columns.get_loc("confidence") + 1, "ci_low",
+                 wilson_interval(frame["holds"], frame["support"])[0].round(4))
+    frame["baseline_S"] = frame["baseline_S"].round(4)
+    frame["recommendation"] = recommend(frame, min_support, min_confidence)
+    return frame.sort_values(["organism", "ci_low", "support"], ascending=[True, False, False],
+                             kind="stable", na_position="last").reset_index(drop=True)
+
+
+def recommend(frame, min_support=M39_MIN_COUNT, min_confidence=MIN_CONFIDENCE):
+    supported = frame["support"] >= min_support
+    confident = frame["ci_low"] >= min_confidence
+    out = pd.Series("-", index=frame.index)
+    out[~frame["existing"] & supported & confident] = "add"
+    out[frame["existing"] & confident] = "keep"
+    out[frame["existing"] & supported & (frame["confidence"] < min_confidence)] = "review"
+    return out
+
+
+# ======================
+# Validation of existing rules
+# ======================
+def rule_agents(rule):
+    return [rule["target"], *(rule.get("refs") or []), *(rule[k] for k in ("ref", "primary", "fallback") if rule.get(k))]
+
+
+def _agree(a, b):
+    return (a["S"] & b["S"]) | (a["I"] & b["I"]) | (a["R"] & b["R"])
+
+
+def rule_contradictions(rule, bits):
+    """
+    Returns:
+      (applicable, contradicted) isolate bitsets of one cascade rule, given the
+      result_bitsets of its organism
+    """
+    get = lambda ab: bits.get(ab, NO_RESULTS)  # noqa: E731
+    kind, t = rule["rule"], get(rule["target"])
+    if kind == "same_as":
+        a = get(rule["ref"])
+        applicable = a["T"] & t["T"]
+        return applicable, applicable & ~_agree(a, t)
+    if kind in ("sus_if_sus", "sus_if_any_sus"):
+        any_s = 0
+        for ref in rule.get("refs") or [rule["ref"]]:
+            any_s |= get(ref)["S"]
+        return any_s & t["T"], any_s & t["NS"]
+    if kind == "sus_if_sus_else_res":
+        a = get(rule["ref"])
+        return a["T"] & t["T"], (a["S"] & t["NS"]) | (a["NS"] & t["S"])
+    if kind == "same_as_else_sus_if_sus":
+        p, f = get(rule["primary"]), get(rule["fallback"])
+        by_primary = p["T"] & t["T"]
+        by_fallback = f["S"] & t["T"] & ~p["T"]
+        return by_primary | by_fallback, (by_primary & ~_agree(p, t)) | (by_fallback & t["NS"])
+    raise ValueError(f"unknown cascade rule: {kind}")
+
+
+def rule_sets(index, rules=None, user_rules=None):
+    """(source, rule set key, cohort organism, cascade list) for every rule set that applies to the cohort."""
+    rules = RULES if rules is None else rules
+    user_rules = USER_RULES if user_rules is None else user_rules
+    present = sorted(org for (kind, *rest) in index.bitmaps if kind == "organism" for org in rest)
+    for org in present:
+        if rules.get(org, {}).get("cascade"):
+            yield "RULES", org, org, rules[org]["cascade"]
+    for org in present:
+        key = normalize_org_name(org)
+        if user_rules.get(key, {}).get("cascade"):
+            yield "USER_RULES", key, org, user_rules[key]["cascade"]
+
+
+def validate_rules(index, rules=None, user_rules=None):
+    """
+    Returns:
+      (report, contradictions): report has one row per (rule, cohort organism)
+      with source, rule_set, organism, position (in the cascade list), rule,
+      target, refs, missing (agents not on the panel), applicable,
+      contradictions and pct_contradicted; contradictions[i] is the bitmap of
+      contradicting isolates of report row i (index.select(contradictions[i]))
+    """
+    out, contradictions = [], []
+    for source, key, org, cascade in rule_sets(index, rules, user_rules):
+        bits = result_bitsets(index, org)
+        panel = ORGANISM_PANELS.get(org, ())
+        for pos, rule in enumerate(cascade):
+            applicable, contradicted = rule_contradictions(rule, bits)
+            agents = rule_agents(rule)
+            out.append((source, key, org, pos, rule["rule"], rule["target"], " / ".join(agents[1:]),
+                        " / ".join(ab for ab in agents if ab not in panel),
+                        applicable.bit_count(), contradicted.bit_count()))
+            contradictions.append(contradicted)
+    report = pd.DataFrame(out, columns=["source", "rule_set", "organism", "position", "rule", "target", "refs",
+                                        "missing", "applicable", "contradictions"])
+    report["pct_contradicted"] = (100 * report["contradictions"]
+                                  / report["applicable"].where(report["applicable"] > 0)).round(1)
+    return report, contradictions
+
+
+def contradiction_rows(index, report, contradictions, limit=None):
+    """Long table of contradicting isolates: report_row, row (cohort index position) and the isolate columns."""
+    pieces = []
+    for i, bits in enumerate(contradictions):
+        if bits:
+            rows = index.select(bits, limit)
+            pieces.append(rows.assign(report_row=i, rule_set=report.at[i, "rule_set"],
+                                      target=report.at[i, "target"]).rename_axis("row").reset_index())
+    if not pieces:
+        return pd.DataFrame(columns=["report_row", "rule_set", "target", "row", *index.rows.columns])
+    out = pd.concat(pieces, ignore_index=True)
+    return out[["report_row", "rule_set", "target", "row", *index.rows.columns]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cascade rules against the cohort")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_mine = sub.add_parser("mine", help="score every candidate pairwise cascade rule")
+    p_mine.add_argument("--cohort", default=COHORT_PATH)
+    p_mine.add_argument("--organism", action="append", default=[])
+    p_mine.add_argument("--min-support", type=int, default=M39_MIN_COUNT)
+    p_mine.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    p_mine.add_argument("--only", choices=["add", "keep", "review"], default=None)
+    p_mine.add_argument("--isolate-cols", default=None)
+    p_mine.add_argument("--out", default="-")
+    p_val = sub.add_parser("validate", help="count cohort contradictions of every RULES / USER_RULES cascade")
+    p_val.add_argument("--cohort", default=COHORT_PATH)
+    p_val.add_argument("--isolate-cols", default=None)
+    p_val.add_argument("--out", default="-")
+    p_val.add_argument("--isolates-out", default=None, help="CSV of contradicting isolates per report row")
+    p_val.add_argument("--limit", type=int, default=None, help="max contradicting isolates per rule")
+    args = parser.parse_args(argv)
+
+    index = CohortIndex(load_cohort(args.cohort, cohort_columns(isolate=args.isolate_cols)), findings=False)
+    if args.cmd == "validate":
+        report, contradictions = validate_rules(index)
+        report.to_csv(sys.stdout if args.out == "-" else args.out, index_label="report_row")
+        if args.isolates_out:
+            contradiction_rows(index, report, contradictions, args.limit).to_csv(args.isolates_out, index=False)
+        print(report.groupby("source")[["applicable", "contradictions"]].sum().to_string(), file=sys.stderr)
+        return
+    table = mine_cascades(index, args.organism or None, args.min_support, args.min_confidence)
+    if args.only:
+        table = table[table["recommendation"] == args.only]
+    table.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+    print(table["recommendation"].value_counts().to_string(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
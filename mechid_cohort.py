@@ -0,0 +1,156 @@
+"""
+Cohort (long-format culture table) -> encoded phenotype matrix.
+
+The cohort file (microbiology_cultures_cohort.csv) has one row per
+isolate x antibiotic. Column names are configurable through COHORT_COLUMNS:
+
+  organism   organism name as reported
+  antibiotic antibiotic name or code
+  result     S/I/R (or Susceptible/Intermediate/Resistant)
+  isolate    column(s) identifying one isolate (with the organism); when none
+             is present, patient + collected (+ organism) identify it, and
+             without those either the table is rejected (ValueError)
+  patient    patient identifier (optional)
+  collected  collection timestamp (optional)
+  ward       ward/unit (optional)
+  specimen   specimen type, e.g. blood/urine (optional)
+
+Organism, antibiotic and result values are normalized once per distinct value
+(pd.factorize + gather), and each organism group is written into a
+(isolates x panel) character grid, so building the matrix involves no per-row
+Python.
+"""
+import numpy as np
+import pandas as pd
+
+from mechid_engine import (
+    ORGANISM_PANELS,
+    RESULT_CODES,
+    _interpret_encoded,
+    _tx_context_key,
+    normalize_antibiotic,
+    normalize_org,
+    normalize_result,
+    panel_agent,
+)
+
+COHORT_PATH = "microbiology_cultures_cohort.csv"
+COHORT_COLUMNS = {
+    "organism": "organism",
+    "antibiotic": "antibiotic",
+    "result": "susceptibility",
+    "isolate": ("isolate_id",),
+    "patient": "patient_id",
+    "collected": "collected",
+    "ward": "ward",
+    "specimen": "specimen_type",
+}
+FINDING_COLUMNS = ("mechanisms", "banners", "favorable", "therapy")
+
+
+def cohort_columns(**overrides):
+    cols = {**COHORT_COLUMNS, **{k: v for k, v in overrides.items() if v is not None}}
+    if isinstance(cols["isolate"], str):
+        cols["isolate"] = tuple(c.strip() for c in cols["isolate"].split(","))
+    return cols
+
+
+def per_unique(values, fn, missing=None):
+    """Apply fn once per distinct value of a column and gather the results."""
+    codes, uniques = pd.factorize(values)
+    table = np.array([fn(u) for u in uniques] + [missing], dtype=object)
+    return table[codes]
+
+
+def _result_code(value):
+    try:
+        return RESULT_CODES.get(normalize_result(value), "")
+    except ValueError:
+        return ""
+
+
+def _canonical_org(name):
+    org = normalize_org(name)
+    return org if org in ORGANISM_PANELS else None
+
+
+def _isolate_keys(keys, cols, long):
+    """Isolate key columns, falling back to patient + collection time when none is present."""
+    if keys:
+        return keys
+    fallback = [cols["patient"], cols["collected"]]
+    if all(c in long.columns for c in fallback):
+        return fallback
+    raise ValueError(
+        f"cohort has none of the isolate columns {list(cols['isolate'])} and no "
+        f"{cols['patient']!r} + {cols['collected']!r} to group rows into isolates"
+    )
+
+
+def cohort_phenotypes(long, columns=None):
+    """
+    Long cohort rows -> one row per isolate.
+
+    Returns:
+      DataFrame with the isolate key columns, organism, phenotype and (when
+      present) patient/collected/ward/specimen, in first-appearance order. When an
+      isolate repeats an antibiotic, the last row wins.
+    """
+    cols = columns or cohort_columns()
+    keys = [c for c in cols["isolate"] if c in long.columns]
+    extras = [
+        cols[k] for k in ("patient", "collected", "ward", "specimen")
+        if cols[k] in long.columns and cols[k] not in keys
+    ]
+
+    org = per_unique(long[cols["organism"]], _canonical_org)
+    ab = per_unique(long[cols["antibiotic"]], normalize_antibiotic)
+    code = per_unique(long[cols["result"]], _result_code, "")
+    keep = (org != None) & (ab != None) & (code != "")  # noqa: E711 (object arrays)
+
+    rows = long.loc[keep, keys + extras].copy()
+    rows["organism"] = org[keep]
+    rows["_ab"], rows["_code"] = ab[keep], code[keep]
+    rows["_iso"] = rows.groupby(_isolate_keys(keys, cols, long) + ["organism"], sort=False, dropna=False).ngroup().to_numpy()
+
+    pieces = []
+    for organism, idx in rows.groupby("organism", sort=False).indices.items():
+        panel = ORGANISM_PANELS[organism]
+        pos_of = {a: i for i, a in enumerate(panel)}
+        sub = rows.iloc[idx]
+        pos = per_unique(sub["_ab"], lambda a: pos_of.get(panel_agent(panel, a), -1), -1).astype(int)
+        iso_codes, iso_ids = pd.factorize(sub["_iso"])
+        grid = np.full((len(iso_ids), len(panel)), "-", dtype="<U1")
+        in_panel = pos >= 0
+        grid[iso_codes[in_panel], pos[in_panel]] = sub["_code"].to_numpy()[in_panel].astype("<U1")
+        first = sub.drop_duplicates("_iso")
+        pieces.append(first[["_iso", *keys, *extras, "organism"]].assign(
+            phenotype=np.ascontiguousarray(grid).view(f"<U{len(panel)}").ravel()
+        ))
+    if not pieces:
+        return pd.DataFrame(columns=[*keys, *extras, "organism", "phenotype"])
+    out = pd.concat(pieces).sort_values("_iso", kind="stable")
+    return out.drop(columns="_iso").reset_index(drop=True)
+
+
+def interpret_matrix(phenotypes, tx_context=None):
+    """
+    Add mechanisms/banners/favorable/therapy columns (" | "-joined); each distinct
+    (organism, phenotype) pair is interpreted once.
+    """
+    pairs = phenotypes[["organism", "phenotype"]].drop_duplicates()
+    lookup = {
+        (org, code): _interpret_encoded(org, code, _tx_context_key(org, tx_context))
+        for org, code in pairs.itertuples(index=False)
+    }
+    keys = pd.Series(list(zip(phenotypes["organism"], phenotypes["phenotype"])), index=phenotypes.index)
+    out = phenotypes.copy()
+    for i, name in enumerate(FINDING_COLUMNS):
+        out[name] = keys.map({k: " | ".join(v[i]) for k, v in lookup.items()})
+    return out
+
+
+def load_cohort(path=COHORT_PATH, columns=None, **read_csv_kwargs):
+    """Read the long cohort CSV (string dtype) and build its phenotype matrix."""
+    long = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""], **read_csv_kwargs)
+    return cohort_phenotypes(long, columns)
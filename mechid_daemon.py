@@ -0,0 +1,234 @@
+"""
+Unix-domain-socket daemon for same-host callers.
+
+    python mechid_daemon.py serve --socket /tmp/mechid.sock
+    python mechid_daemon.py bench --socket /tmp/mechid.sock --calls 20000
+
+Every message is a 4-byte big-endian length followed by the body; the first body
+byte is the op code.
+
+  OP_INTERPRET  request : op | org index (u16) | context (u8) | phenotype (ASCII, one char per panel agent)
+                response: status (u8) | 4 x count (u8) | finding IDs (u32 each), in FINDING_KINDS order
+                          (at most 255 IDs per kind; longer sections are truncated)
+  OP_ORGANISMS  request : op
+                response: status | UTF-8 "organism\\tpanel agent|panel agent|..." lines (index = line number)
+  OP_LOOKUP     request : op | finding IDs (u32 each)
+                response: status | UTF-8 finding texts, one per line ("" if never emitted)
+
+Context byte is syndrome_index * len(GNR_SEVERITIES) + severity_index, or 255 for none.
+Status 0 = ok, 1 = bad request.
+"""
+import argparse
+import functools
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import time
+
+from mechid_engine import (
+    GNR_SEVERITIES,
+    GNR_SYNDROMES,
+    ORGANISM_PANELS,
+    _interpret_encoded,
+    _tx_context_key,
+    finding_id,
+)
+
+OP_INTERPRET = 1
+OP_ORGANISMS = 2
+OP_LOOKUP = 3
+STATUS_OK = 0
+STATUS_BAD_REQUEST = 1
+NO_CONTEXT = 255
+MAX_MESSAGE_BYTES = 64 * 1024
+MAX_FINDINGS_PER_KIND = 255
+
+ORGANISM_CODES = sorted(ORGANISM_PANELS)
+_LEN = struct.Struct(">I")
+_INTERPRET_HEAD = struct.Struct(">BHB")
+
+# finding ID -> text for every finding this process has emitted
+_FINDING_TEXTS = {}
+
+
+def _context_from_byte(ctx):
+    if ctx == NO_CONTEXT:
+        return None
+    syndrome, severity = divmod(ctx, len(GNR_SEVERITIES))
+    if syndrome >= len(GNR_SYNDROMES):
+        raise ValueError("context out of range")
+    return {"syndrome": GNR_SYNDROMES[syndrome], "severity": GNR_SEVERITIES[severity]}
+
+
+def context_byte(syndrome=None, severity=None):
+    if syndrome is None and severity is None:
+        return NO_CONTEXT
+    return GNR_SYNDROMES.index(syndrome or "Not specified") * len(GNR_SEVERITIES) + GNR_SEVERITIES.index(
+        severity or "Not specified"
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def _interpret_message(body):
+    _, org_idx, ctx = _INTERPRET_HEAD.unpack_from(body)
+    org = ORGANISM_CODES[org_idx]
+    code = body[_INTERPRET_HEAD.size:].decode("ascii")
+    if len(code) != len(ORGANISM_PANELS[org]) or set(code) - set("-SIR"):
+        raise ValueError("phenotype does not match organism panel")
+    sections = _interpret_encoded(org, code, _tx_context_key(org, _context_from_byte(ctx)))
+    # counts are one byte each, so IDs are truncated to match (never more than 255 per kind)
+    sections = [list(texts)[:MAX_FINDINGS_PER_KIND] for texts in sections]
+    ids = []
+    for texts in sections:
+        for text in texts:
+            fid = finding_id(text)
+            _FINDING_TEXTS[fid] = text
+            ids.append(fid)
+    return (
+        bytes([STATUS_OK, *(len(t) for t in sections)])
+        + struct.pack(f">{len(ids)}I", *ids)
+    )
+
+
+def handle_message(body):
+    op = body[0] if body else 0
+    try:
+        if op == OP_INTERPRET:
+            return _interpret_message(bytes(body))
+        if op == OP_ORGANISMS:
+            lines = (f"{org}\t{'|'.join(ORGANISM_PANELS[org])}" for org in ORGANISM_CODES)
+            return bytes([STATUS_OK]) + "\n".join(lines).encode("utf-8")
+        if op == OP_LOOKUP:
+            ids = struct.unpack(f">{(len(body) - 1) // 4}I", body[1:1 + 4 * ((len(body) - 1) // 4)])
+            return bytes([STATUS_OK]) + "\n".join(_FINDING_TEXTS.get(i, "") for i in ids).encode("utf-8")
+    except (IndexError, ValueError, UnicodeDecodeError, struct.error):
+        pass
+    return bytes([STATUS_BAD_REQUEST])
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("socket closed")
+        buf += chunk
+    return bytes(buf)
+
+
+class _DaemonHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        try:
+            while True:
+                (length,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+                if length > MAX_MESSAGE_BYTES:
+                    sock.sendall(_LEN.pack(1) + bytes([STATUS_BAD_REQUEST]))
+                    return
+                reply = handle_message(_recv_exact(sock, length))
+                sock.sendall(_LEN.pack(len(reply)) + reply)
+        except ConnectionError:
+            return
+
+
+class MechIDDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    with MechIDDaemon(path, _DaemonHandler) as server:
+        os.chmod(path, 0o660)
+        print(f"MechID daemon on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+class MechIDClient:
+    """Blocking client that keeps one connection open."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self._organisms = None
+
+    def close(self):
+        self.sock.close()
+
+    def _call(self, body):
+        self.sock.sendall(_LEN.pack(len(body)) + body)
+        (length,) = _LEN.unpack(_recv_exact(self.sock, _LEN.size))
+        reply = _recv_exact(self.sock, length)
+        if reply[0] != STATUS_OK:
+            raise ValueError("MechID daemon rejected the request")
+        return reply[1:]
+
+    def organisms(self):
+        if self._organisms is None:
+            rows = self._call(bytes([OP_ORGANISMS])).decode("utf-8").split("\n")
+            self._organisms = {org: (i, panel.split("|")) for i, (org, panel) in enumerate(r.split("\t") for r in rows)}
+        return self._organisms
+
+    def interpret(self, organism, phenotype, syndrome=None, severity=None):
+        """Returns finding IDs grouped as (mechanisms, banners, favorable, therapy)."""
+        org_idx = self.organisms()[organism][0]
+        reply = self._call(
+            _INTERPRET_HEAD.pack(OP_INTERPRET, org_idx, context_byte(syndrome, severity)) + phenotype.encode("ascii")
+        )
+        counts, ids = reply[:4], struct.unpack(f">{(len(reply) - 4) // 4}I", reply[4:])
+        out, pos = [], 0
+        for n in counts:
+            out.append(ids[pos:pos + n])
+            pos += n
+        return tuple(out)
+
+    def lookup(self, ids):
+        return self._call(bytes([OP_LOOKUP]) + struct.pack(f">{len(ids)}I", *ids)).decode("utf-8").split("\n")
+
+
+def bench(path, calls=20000):
+    client = MechIDClient(path)
+    org = "Escherichia coli"
+    panel = client.organisms()[org][1]
+    phenotypes = ["".join("SIR-"[(i * 7 + j) % 4] for j in range(len(panel))) for i in range(64)]
+    client.interpret(org, phenotypes[0])
+    latencies = []
+    for i in range(calls):
+        t0 = time.perf_counter()
+        client.interpret(org, phenotypes[i % len(phenotypes)], "Bloodstream infection", "Non-severe")
+        latencies.append(time.perf_counter() - t0)
+    client.close()
+    latencies.sort()
+    return {
+        "calls": calls,
+        "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "p99_us": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "calls_per_s": round(calls / sum(latencies), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID Unix-domain-socket daemon")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--socket", default="/tmp/mechid.sock")
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--socket", default="/tmp/mechid.sock")
+    p_bench.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args(argv)
+    if args.cmd == "serve":
+        serve(args.socket)
+    else:
+        print(json.dumps(bench(args.socket, args.calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
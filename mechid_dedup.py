@@ -0,0 +1,215 @@
+"""
+First-isolate-per-patient deduplication.
+
+    python mechid_dedup.py --cohort microbiology_cultures_cohort.csv --window-days 30 --out first_isolates.csv
+
+An isolate is "first" when it is the earliest for its (patient, organism [, period])
+or was collected at least `window_days` after the previous *first* isolate of
+that patient and organism (episode rule; with window_days=None only the earliest
+per key counts, as in CLSI M39 per-period deduplication).
+
+Batch mode sorts once by (key, time). The episode rule depends on the previous
+counted isolate, so it is resolved with jump pointers: next[i] is the first row
+of the same key at or after time[i] + window (one searchsorted over a combined
+(key, time) value), and first isolates are the rows reachable from each key's
+earliest row. Each round advances every key at once; the number of rounds is
+the largest number of episodes of any one key.
+
+Streaming mode (FirstIsolateStore) keeps one int64 per (patient, organism): the
+time of its last first isolate. Batches are deduplicated against that anchor with
+the same pass. A row older than the anchor (a late arrival) is first only when
+it was collected at least `window_days` before it, i.e. it opens an earlier
+episode of its own; later first isolates are never retracted, so a late arrival
+inside the anchor's window is suppressed even where the batch rule would have
+counted it instead of the anchor.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, per_unique
+from mechid_engine import normalize_org
+
+SECONDS_PER_DAY = 86_400
+NO_TIME = np.iinfo(np.int64).min
+
+
+def _seconds(collected):
+    """Collection times as int64 epoch seconds; NO_TIME where missing/unparseable."""
+    ns = pd.to_datetime(pd.Series(collected), errors="coerce").to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return np.where(ns == NO_TIME, NO_TIME, ns // 10**9)
+
+
+def _window(window_days):
+    return None if window_days is None else int(round(window_days * SECONDS_PER_DAY))
+
+
+def _chain_firsts(group, times, window, anchors=None):
+    """
+    Mark first isolates in rows sorted by (group, time).
+
+    anchors (streaming) holds, per row, the time of its group's last first
+    isolate from earlier batches (NO_TIME if none); rows at least a window
+    before the anchor are chained as an earlier episode. Undated rows are first
+    only for a group with no dated rows and no anchor.
+    """
+    n = len(times)
+    first = np.zeros(n, dtype=bool)
+    if not n:
+        return first
+    no_anchor = np.ones(n, dtype=bool) if anchors is None else anchors == NO_TIME
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    dated = times != NO_TIME
+    # groups whose rows are all undated: their earliest row stands in
+    undated_groups = ~np.logical_or.reduceat(dated, starts)
+    first[starts[undated_groups & no_anchor[starts]]] = True
+
+    idx = np.flatnonzero(dated)
+    if not len(idx):
+        return first
+    g, t = group[idx], times[idx]
+    g_starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    if window is None:
+        keep = g_starts[no_anchor[idx[g_starts]]]
+        first[idx[keep]] = True
+        return first
+
+    # one monotone value over (group rank, time) so a single searchsorted finds
+    # the next row of the same group at or after time + window
+    t0 = int(t.min())
+    span = int(t.max()) - t0 + window + 1
+    rank = np.cumsum(np.r_[True, g[1:] != g[:-1]]) - 1
+    if span * (int(rank[-1]) + 2) >= 2**62:
+        raise ValueError("Collection time range too wide for first-isolate search")
+    combined = rank * span + (t - t0)
+    group_end = np.r_[g_starts[1:], len(idx)]
+
+    # chains run from `frontier` up to (not including) `bound`
+    frontier, bound = g_starts, group_end
+    if anchors is not None:
+        a = anchors[idx[g_starts]]
+        has = a != NO_TIME
+        starts_a, end_a, a = g_starts[has], group_end[has], a[has]
+        base = rank[starts_a] * span - t0
+        # late arrivals at least a window before the anchor chain on their own
+        late_end = np.clip(np.searchsorted(combined, base + a - window, side="right"), starts_a, end_a)
+        due = np.searchsorted(combined, np.maximum(combined[starts_a], base + a + window), side="left")
+        frontier = np.r_[g_starts[~has], starts_a, due]
+        bound = np.r_[group_end[~has], late_end, end_a]
+        keep = frontier < bound
+        frontier, bound = frontier[keep], bound[keep]
+    while len(frontier):
+        first[idx[frontier]] = True
+        nxt = np.searchsorted(combined, combined[frontier] + window, side="left")
+        keep = nxt < bound
+        frontier, bound = nxt[keep], bound[keep]
+    return first
+
+
+def first_isolate_flags(frame, patient, organism, collected, window_days=None, period=None):
+    """
+    Returns a bool Series aligned with `frame`: True for first isolates.
+
+    One row per isolate is expected (deduplicate results to isolates first).
+    `period` (a column of labels) adds the period to the key, M39 style. Ties
+    on collection time go to the earlier row.
+    """
+    keys = [frame[patient].astype(str), frame[organism].astype(str)]
+    if period is not None:
+        keys.append(frame[period].astype(str))
+    key_codes = pd.MultiIndex.from_arrays(keys).factorize()[0]
+    times = _seconds(frame[collected])
+    # undated rows sort after dated ones within a key
+    order = np.lexsort((np.arange(len(frame)), np.where(times == NO_TIME, np.iinfo(np.int64).max, times), key_codes))
+    flags = np.empty(len(frame), dtype=bool)
+    flags[order] = _chain_firsts(key_codes[order], times[order], _window(window_days))
+    return pd.Series(flags, index=frame.index)
+
+
+class FirstIsolateStore:
+    """Streaming first-isolate state: (patient, organism) -> time of last first isolate."""
+
+    def __init__(self, window_days=30):
+        self.window_days = window_days
+        self.anchors = {}
+
+    def _keys(self, patients, organisms):
+        return pd.util.hash_pandas_object(
+            pd.DataFrame({"p": pd.Series(patients).astype(str).to_numpy(),
+                          "o": pd.Series(organisms).astype(str).to_numpy()}), index=False
+        ).to_numpy()
+
+    def process(self, patients, organisms, collected):
+        """Flag first isolates in a batch (one row per isolate) and advance the state."""
+        keys = self._keys(patients, organisms)
+        times = _seconds(collected)
+        order = np.lexsort((np.arange(len(keys)), np.where(times == NO_TIME, np.iinfo(np.int64).max, times), keys))
+        k, t = keys[order], times[order]
+        uniq, inverse = np.unique(k, return_inverse=True)
+        anchors = np.fromiter((self.anchors.get(int(x), NO_TIME) for x in uniq), dtype=np.int64, count=len(uniq))
+        first_sorted = _chain_firsts(k, t, _window(self.window_days), anchors[inverse])
+        # the latest dated first isolate of each key becomes its anchor (late
+        # arrivals opening an earlier episode leave it where it is)
+        hit = first_sorted & (t != NO_TIME)
+        latest = pd.Series(t[hit]).groupby(k[hit]).max()
+        self.anchors.update((key, max(value, self.anchors.get(key, NO_TIME)))
+                            for key, value in zip(latest.index.tolist(), latest.tolist()))
+        flags = np.empty(len(keys), dtype=bool)
+        flags[order] = first_sorted
+        return flags
+
+    def expire(self, before):
+        """Drop keys whose window closed before `before`; returns how many were dropped."""
+        if self.window_days is None:
+            return 0
+        cutoff = pd.Timestamp(before).value // 10**9 - _window(self.window_days)
+        stale = [k for k, v in self.anchors.items() if v < cutoff]
+        for k in stale:
+            del self.anchors[k]
+        return len(stale)
+
+    def save(self, path):
+        keys = np.fromiter(self.anchors.keys(), dtype=np.uint64, count=len(self.anchors))
+        values = np.fromiter(self.anchors.values(), dtype=np.int64, count=len(self.anchors))
+        np.savez_compressed(path, keys=keys, values=values, window_days=np.array(
+            [-1 if self.window_days is None else self.window_days], dtype=float))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        window = float(data["window_days"][0])
+        store = cls(None if window < 0 else window)
+        store.anchors = dict(zip(data["keys"].tolist(), data["values"].tolist()))
+        return store
+
+
+def dedup_cohort(long, columns=None, window_days=None):
+    """Long cohort rows -> isolate table with a `first_isolate` flag."""
+    cols = columns or cohort_columns()
+    keys = [c for c in cols["isolate"] if c in long]
+    if not keys:
+        keys = [c for c in (cols["patient"], cols["collected"]) if c in long]
+    iso = long.drop_duplicates(keys + [cols["organism"]]).copy()
+    iso["_organism"] = per_unique(iso[cols["organism"]], lambda o: normalize_org(str(o).strip()))
+    iso["first_isolate"] = first_isolate_flags(iso, cols["patient"], "_organism", cols["collected"], window_days)
+    return iso.drop(columns=["_organism"] + [c for c in (cols["antibiotic"], cols["result"]) if c in iso])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="First isolate per patient per organism")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--window-days", type=float, default=None,
+                        help="episode window; omit for earliest isolate per patient/organism only")
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args(argv)
+    long = pd.read_csv(args.cohort, dtype=str, keep_default_na=False, na_values=[""])
+    iso = dedup_cohort(long, cohort_columns(isolate=args.isolate_cols), args.window_days)
+    iso.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+    print(f"{int(iso['first_isolate'].sum())} first isolates of {len(iso)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
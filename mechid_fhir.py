@@ -0,0 +1,308 @@
+"""
+FHIR R4 microbiology bundle ingestion.
+
+    python mechid_fhir.py export.json --out mechid_observations.ndjson
+    python mechid_fhir.py bulk/Observation.ndjson --out mechid_bundle.json --format bundle
+
+Bundles are never loaded whole: the top-level "entry" array is located with a
+small scanner and each entry is decoded on its own with JSONDecoder.raw_decode
+over a sliding buffer (NDJSON bulk exports are read line by line). Only
+Observation resources are kept.
+
+Isolates:
+  - an organism Observation has an organism-identification code (e.g. LOINC
+    600-7) and a valueCodeableConcept naming the organism;
+  - susceptibility Observations link to it through the organism's hasMember,
+    their own derivedFrom, or (failing both) a single organism on the same
+    specimen;
+  - observations are grouped by specimen; a specimen group is interpreted once
+    MAX_OPEN_SPECIMENS newer specimens have been seen (exports are normally
+    specimen-ordered) or at end of file, in chunks through the batch engine.
+
+Output is one MechID Observation per isolate carrying finding codes from
+FINDING_SYSTEM (NDJSON by default, or a streamed collection Bundle).
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+from collections import OrderedDict
+
+from mechid_engine import (
+    FINDING_KINDS,
+    finding_id,
+    finding_label,
+    interpret_batch,
+    normalize_antibiotic,
+    normalize_result,
+)
+
+READ_BLOCK = 1 << 20
+MAX_OPEN_SPECIMENS = 256
+CHUNK_ISOLATES = 500
+FINDING_SYSTEM = "urn:mechid:finding"
+ORGANISM_CODES = {"600-7", "634-6", "11475-1", "6463-4", "43409-2"}
+
+
+# ======================
+# Incremental JSON reading
+# ======================
+def _find_entry_array(stream):
+    """Advance past `"entry": [` at depth 1; return (buffer tail, found)."""
+    depth, in_str, escape, token = 0, False, False, []
+    while True:
+        block = stream.read(READ_BLOCK)
+        if not block:
+            return "", False
+        for i, ch in enumerate(block):
+            if in_str:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_str = False
+                elif depth == 1:
+                    token.append(ch)
+                continue
+            if ch == '"':
+                in_str, token = True, []
+            elif ch in "{[":
+                if ch == "[" and depth == 1 and "".join(token) == "entry":
+                    return block[i + 1:], True
+                depth += 1
+            elif ch in "}]":
+                depth -= 1
+            elif ch not in ": \t\r\n":
+                token = []
+
+
+def iter_bundle_entries(stream):
+    """Yield the entries of a Bundle's top-level "entry" array one at a time."""
+    decoder = json.JSONDecoder()
+    buf, found = _find_entry_array(stream)
+    if not found:
+        return
+    pos, eof = 0, False
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        try:
+            entry, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            block = stream.read(READ_BLOCK)
+            eof = not block
+            buf, pos = buf[pos:] + block, 0
+            continue
+        yield entry
+        pos = end
+        if pos > READ_BLOCK:
+            buf, pos = buf[pos:], 0
+
+
+def iter_resources(path):
+    """Observation resources from a Bundle JSON file or an NDJSON bulk file."""
+    with open(path, encoding="utf-8") as fh:
+        if path.endswith(".ndjson"):
+            for line in fh:
+                line = line.strip()
+                if line:
+                    res = json.loads(line)
+                    if res.get("resourceType") == "Observation":
+                        yield res
+            return
+        for entry in iter_bundle_entries(fh):
+            res = entry.get("resource") or {}
+            if res.get("resourceType") == "Observation":
+                yield res
+
+
+# ======================
+# Observations -> isolates
+# ======================
+def _codings(concept):
+    concept = concept or {}
+    return concept.get("coding") or [], concept.get("text") or ""
+
+
+def _concept_text(concept):
+    codings, text = _codings(concept)
+    for c in codings:
+        if c.get("display"):
+            return c["display"]
+    return text or (codings[0].get("code", "") if codings else "")
+
+
+def _ref_id(ref):
+    return ((ref or {}).get("reference") or "").rsplit("/", 1)[-1]
+
+
+def _is_organism_obs(obs):
+    codings, text = _codings(obs.get("code"))
+    return any(c.get("code") in ORGANISM_CODES for c in codings) or "organism" in text.lower()
+
+
+def _antibiotic_of(obs):
+    codings, text = _codings(obs.get("code"))
+    for candidate in [text, *(c.get("display") for c in codings), *(c.get("code") for c in codings)]:
+        ab = normalize_antibiotic(candidate) if candidate else None
+        if ab:
+            return ab
+    return None
+
+
+def _result_of(obs):
+    for concept in obs.get("interpretation") or []:
+        for c in _codings(concept)[0]:
+            try:
+                res = normalize_result(c.get("code"))
+            except ValueError:
+                continue
+            if res:
+                return res
+    for c in _codings(obs.get("valueCodeableConcept"))[0]:
+        try:
+            res = normalize_result(c.get("code"))
+        except ValueError:
+            continue
+        if res:
+            return res
+    return None
+
+
+def _isolates_for_specimen(specimen, observations):
+    organisms = {o["id"]: o for o in observations if _is_organism_obs(o)}
+    member_of = {}
+    for org_id, o in organisms.items():
+        for ref in o.get("hasMember") or []:
+            member_of[_ref_id(ref)] = org_id
+    isolates = {
+        org_id: {
+            "specimen": specimen,
+            "patient_id": _ref_id(o.get("subject")),
+            "organism_observation": org_id,
+            "collected": o.get("effectiveDateTime", ""),
+            "organism": _concept_text(o.get("valueCodeableConcept")),
+            "results": {},
+        }
+        for org_id, o in organisms.items()
+    }
+    for o in observations:
+        if o["id"] in organisms:
+            continue
+        ab = _antibiotic_of(o)
+        res = _result_of(o)
+        if not ab or not res:
+            continue
+        org_id = member_of.get(o["id"]) or next(
+            (_ref_id(r) for r in o.get("derivedFrom") or [] if _ref_id(r) in organisms), None
+        )
+        if org_id is None and len(organisms) == 1:
+            org_id = next(iter(organisms))
+        if org_id is not None:
+            isolates[org_id]["results"][ab] = res
+    return [iso for iso in isolates.values() if iso["results"]]
+
+
+def iter_isolates(observations, max_open=MAX_OPEN_SPECIMENS):
+    """Group a stream of Observations by specimen and yield assembled isolates."""
+    open_groups = OrderedDict()
+    for i, obs in enumerate(observations):
+        obs.setdefault("id", f"anon-{i}")
+        specimen = _ref_id(obs.get("specimen")) or f"nospecimen-{_ref_id(obs.get('subject'))}"
+        open_groups.setdefault(specimen, []).append(obs)
+        open_groups.move_to_end(specimen)
+        if len(open_groups) > max_open:
+            yield from _isolates_for_specimen(*open_groups.popitem(last=False))
+    while open_groups:
+        yield from _isolates_for_specimen(*open_groups.popitem(last=False))
+
+
+# ======================
+# MechID findings -> FHIR Observation
+# ======================
+def to_fhir_observation(isolate, interp):
+    components = []
+    for kind, key in zip(FINDING_KINDS, ("mechanisms", "banners", "favorable", "therapy")):
+        for text in interp.get(key, []):
+            components.append({
+                "code": {"coding": [{
+                    "system": FINDING_SYSTEM,
+                    "code": finding_label(finding_id(text)),
+                    "display": text,
+                }]},
+                "valueString": kind,
+            })
+    obs = {
+        "resourceType": "Observation",
+        "status": "preliminary",
+        "code": {"coding": [{"system": FINDING_SYSTEM, "code": "interpretation", "display": "MechID interpretation"}]},
+        "specimen": {"reference": f"Specimen/{isolate['specimen']}"},
+        "derivedFrom": [{"reference": f"Observation/{isolate['organism_observation']}"}],
+        "valueString": interp.get("phenotype", ""),
+        "component": components,
+    }
+    if isolate.get("patient_id"):
+        obs["subject"] = {"reference": f"Patient/{isolate['patient_id']}"}
+    if "error" in interp:
+        obs["status"] = "cancelled"
+        obs["note"] = [{"text": interp["error"]}]
+    return obs
+
+
+def run(paths, out, fmt="ndjson", chunk_size=CHUNK_ISOLATES):
+    stats = {"observations": 0, "isolates": 0, "errors": 0}
+    t0 = time.perf_counter()
+
+    def _observations():
+        for path in paths:
+            for res in iter_resources(path):
+                stats["observations"] += 1
+                yield res
+
+    if fmt == "bundle":
+        out.write('{"resourceType": "Bundle", "type": "collection", "entry": [\n')
+    first = True
+    isolates = iter_isolates(_observations())
+    while True:
+        chunk = list(itertools.islice(isolates, chunk_size))
+        if not chunk:
+            break
+        for iso, interp in zip(chunk, interpret_batch(chunk)):
+            stats["isolates"] += 1
+            stats["errors"] += "error" in interp
+            obs = to_fhir_observation(iso, interp)
+            if fmt == "bundle":
+                out.write(("" if first else ",\n") + json.dumps({"resource": obs}, ensure_ascii=False))
+            else:
+                out.write(json.dumps(obs, ensure_ascii=False) + "\n")
+            first = False
+    if fmt == "bundle":
+        out.write("\n]}\n")
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID FHIR R4 bundle ingestion")
+    parser.add_argument("paths", nargs="+", help="Bundle .json or bulk .ndjson files")
+    parser.add_argument("--out", default="-")
+    parser.add_argument("--format", choices=["ndjson", "bundle"], default="ndjson")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ISOLATES)
+    args = parser.parse_args(argv)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        stats = run(args.paths, out, args.format, args.chunk_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps(stats), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+HL7 v2 ORU^R01 microbiology ingestion.
+
+    python mechid_hl7.py parse results/*.hl7 --out interpretations.jsonl
+    python mechid_hl7.py mllp --port 2575 --out interpretations.jsonl
+
+Messages are read one at a time (plain files with MSH-delimited messages or
+MLLP-framed streams), isolates are assembled per message and interpreted in
+chunks through the batch engine, so memory stays bounded by one message plus one
+chunk regardless of file size.
+
+Isolate assembly:
+  - the organism comes from an OBX whose OBX-3 is an organism-identification
+    code/text (or whose coded OBX-5 names a supported organism);
+  - susceptibility OBX rows are mapped with normalize_antibiotic() on OBX-3 and
+    read from OBX-8 (abnormal flag S/I/R), falling back to OBX-5;
+  - rows belong to the same isolate when they share the OBX-4 sub-ID, or when a
+    child OBR points at the organism's sub-ID through OBR-26 (parent result).
+"""
+import argparse
+import itertools
+import json
+import socketserver
+import sys
+import threading
+import time
+
+from mechid_engine import (
+    ORGANISM_REGISTRY,
+    interpret_batch,
+    normalize_antibiotic,
+    normalize_org,
+    normalize_result,
+)
+
+MLLP_START = "\x0b"
+MLLP_END = "\x1c"
+CHUNK_ISOLATES = 500
+READ_BLOCK = 1 << 16
+
+# LOINC / common local codes for "organism identified" observations
+ORGANISM_OBX_CODES = {"600-7", "634-6", "11475-1", "6463-4", "43409-2", "ORG", "ORGANISM"}
+
+
+# ======================
+# Message framing
+# ======================
+def iter_hl7_messages(stream):
+    """Yield HL7 messages from a text stream, MLLP-framed or MSH-delimited."""
+    buf = ""
+    while True:
+        block = stream.read(READ_BLOCK)
+        if block:
+            buf += block.replace("\r\n", "\r").replace("\n", "\r")
+        while True:
+            start = buf.find("MSH", 1)
+            while start > 0 and buf[start - 1] not in "\r" + MLLP_START + MLLP_END:
+                start = buf.find("MSH", start + 1)
+            if start < 0:
+                break
+            msg = buf[:start].strip("\r" + MLLP_START + MLLP_END)
+            buf = buf[start:]
+            if msg.startswith("MSH"):
+                yield msg
+        if not block:
+            msg = buf.strip("\r" + MLLP_START + MLLP_END)
+            if msg.startswith("MSH"):
+                yield msg
+            return
+
+
+# ======================
+# ORU^R01 -> isolates
+# ======================
+def _comp(field, idx, sep):
+    parts = field.split(sep)
+    return parts[idx].strip() if idx < len(parts) else ""
+
+
+def parse_oru(message):
+    """Return the isolates of one ORU^R01 message as dicts (raw organism + results)."""
+    segments = [s for s in message.split("\r") if s]
+    if not segments or not segments[0].startswith("MSH"):
+        return []
+    field_sep = segments[0][3]
+    comp_sep = segments[0][4] if len(segments[0]) > 4 else "^"
+    msh = segments[0].split(field_sep)
+    control_id = msh[9] if len(msh) > 9 else ""
+
+    patient_id, accession, collected, parent_sub = "", "", "", None
+    isolates = {}
+
+    def _isolate(sub):
+        return isolates.setdefault(sub, {
+            "message_id": control_id,
+            "patient_id": patient_id,
+            "accession": accession,
+            "collected": collected,
+            "isolate_seq": sub,
+            "organism": None,
+            "results": {},
+            "unmapped": [],
+        })
+
+    for seg in segments[1:]:
+        f = seg.split(field_sep)
+        kind = f[0]
+        if kind == "PID":
+            patient_id = _comp(f[3], 0, comp_sep) if len(f) > 3 else ""
+        elif kind == "OBR":
+            accession = _comp(f[3], 0, comp_sep) if len(f) > 3 and f[3] else (_comp(f[2], 0, comp_sep) if len(f) > 2 else "")
+            collected = f[7] if len(f) > 7 else ""
+            parent = _comp(f[26], 1, comp_sep) if len(f) > 26 else ""
+            parent_sub = parent.split(".")[0] or None
+        elif kind == "OBX" and len(f) > 5:
+            code = _comp(f[3], 0, comp_sep)
+            text = _comp(f[3], 1, comp_sep)
+            sub = (f[4] if len(f) > 4 else "").split(".")[0] or "1"
+            value_text = _comp(f[5], 1, comp_sep) or _comp(f[5], 0, comp_sep)
+
+            is_org_code = code.upper() in ORGANISM_OBX_CODES or "organism" in text.lower()
+            if is_org_code or (f[2] in {"CE", "CWE"} and normalize_org(value_text) in ORGANISM_REGISTRY):
+                _isolate(sub)["organism"] = value_text
+                continue
+
+            ab = normalize_antibiotic(text) or normalize_antibiotic(code)
+            if ab is None:
+                continue
+            iso = _isolate(parent_sub or sub)
+            flag = _comp(f[8], 0, comp_sep) if len(f) > 8 else ""
+            try:
+                result = normalize_result(flag) if flag else normalize_result(value_text)
+            except ValueError:
+                iso["unmapped"].append(f"{ab}={flag or value_text}")
+                continue
+            if result is not None:
+                iso["results"][ab] = result
+    return [iso for iso in isolates.values() if iso["organism"] and iso["results"]]
+
+
+# ======================
+# Pipeline
+# ======================
+def _interpret_isolates(isolates, out, stats, chunk_size=CHUNK_ISOLATES):
+    it = iter(isolates)
+    while True:
+        chunk = list(itertools.islice(it, chunk_size))
+        if not chunk:
+            return
+        for iso, interp in zip(chunk, interpret_batch(chunk)):
+            stats["isolates"] += 1
+            if "error" in interp:
+                stats["errors"] += 1
+            record = {**iso, **interp}
+            if "unmapped" in interp:
+                # parser-side (flags / unparseable values) and engine-side entries
+                record["unmapped"] = iso["unmapped"] + interp["unmapped"]
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def run_messages(messages, out, chunk_size=CHUNK_ISOLATES):
+    """Parse + interpret a message iterator, writing JSONL; returns throughput stats."""
+    stats = {"messages": 0, "isolates": 0, "errors": 0}
+    t0 = time.perf_counter()
+
+    def _isolates():
+        for msg in messages:
+            stats["messages"] += 1
+            yield from parse_oru(msg)
+
+    _interpret_isolates(_isolates(), out, stats, chunk_size)
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 3)
+    stats["messages_per_s"] = round(stats["messages"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def run_files(paths, out, chunk_size=CHUNK_ISOLATES):
+    def _messages():
+        for path in paths:
+            with open(path, encoding="utf-8", errors="replace", newline="") as fh:
+                yield from iter_hl7_messages(fh)
+
+    return run_messages(_messages(), out, chunk_size)
+
+
+# ======================
+# MLLP listener (local stand-in for the analyser/LIS feed)
+# ======================
+def _ack(message, code="AA"):
+    field_sep = message[3] if len(message) > 3 else "|"
+    msh = message.split("\r", 1)[0].split(field_sep)
+    control_id = msh[9] if len(msh) > 9 else ""
+    return (
+        f"{MLLP_START}MSH{field_sep}^~\\&{field_sep}MECHID{field_sep}{field_sep}{field_sep}{field_sep}"
+        f"{time.strftime('%Y%m%d%H%M%S')}{field_sep}{field_sep}ACK^R01{field_sep}{control_id}{field_sep}P{field_sep}2.5\r"
+        f"MSA{field_sep}{code}{field_sep}{control_id}\r{MLLP_END}\r"
+    )
+
+
+class _MLLPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        buf = b""
+        while True:
+            try:
+                data = self.request.recv(READ_BLOCK)
+            except ConnectionError:
+                return
+            if not data:
+                return
+            buf += data
+            while b"\x1c\r" in buf:
+                frame, buf = buf.split(b"\x1c\r", 1)
+                message = frame.lstrip(b"\x0b").decode("utf-8", errors="replace").replace("\n", "\r")
+                self.server.process(message)
+                self.request.sendall(_ack(message).encode("utf-8"))
+
+
+class MLLPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, out):
+        super().__init__(address, _MLLPHandler)
+        self.out = out
+        self.stats = {"messages": 0, "isolates": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def process(self, message):
+        isolates = parse_oru(message)
+        with self._lock:
+            self.stats["messages"] += 1
+            _interpret_isolates(isolates, self.out, self.stats)
+            self.out.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID HL7 v2 ORU^R01 ingestion")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_parse = sub.add_parser("parse", help="interpret HL7 files")
+    p_parse.add_argument("paths", nargs="+")
+    p_parse.add_argument("--out", default="-")
+    p_parse.add_argument("--chunk-size", type=int, default=CHUNK_ISOLATES)
+    p_mllp = sub.add_parser("mllp", help="listen for MLLP-framed messages")
+    p_mllp.add_argument("--host", default="127.0.0.1")
+    p_mllp.add_argument("--port", type=int, default=2575)
+    p_mllp.add_argument("--out", default="-")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.out == "-" else open(args.out, "a", encoding="utf-8")
+    try:
+        if args.cmd == "parse":
+            stats = run_files(args.paths, out, args.chunk_size)
+            print(json.dumps(stats), file=sys.stderr)
+        else:
+            with MLLPServer((args.host, args.port), out) as server:
+                print(f"MechID MLLP listener on {args.host}:{args.port}", file=sys.stderr)
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    print(json.dumps(server.stats), file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Inverted bitmap index over the cohort.
+
+    python mechid_index.py --cohort microbiology_cultures_cohort.csv \\
+        --group Enterobacterales --result Ertapenem=R --result Meropenem=S
+
+Bit i of every bitmap is isolate row i of the cohort phenotype matrix. Bitmaps
+are Python ints (AND/OR/NOT and popcount run in C over machine words, and an
+index of 1M isolates costs 125 KB per dense bitmap; bitmaps for rare keys are
+mostly zero high words and compress well if pickled/zlib'd). Keys:
+
+  ("result", antibiotic, "S" | "I" | "R")
+  ("organism", organism)
+  ("finding", finding label)     mechanism / banner / favorable / therapy notes
+                                 (skipped with findings=False)
+
+Bitmaps are built from numpy masks with np.packbits, so building is one pass
+per column rather than per isolate.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+import numpy as np
+
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_engine import (
+    ENTEROBACTERALES,
+    FINDING_KINDS,
+    ORGANISM_PANELS,
+    RESULT_CODES,
+    _interpret_encoded,
+    _tx_context_key,
+    finding_id,
+    finding_label,
+    normalize_antibiotic,
+    normalize_result,
+)
+
+ORGANISM_GROUPS = {
+    "Enterobacterales": sorted(ENTEROBACTERALES),
+    "Non-fermenters": ["Acinetobacter baumannii complex", "Pseudomonas aeruginosa",
+                       "Stenotrophomonas maltophilia", "Achromobacter xylosoxidans"],
+}
+
+
+def mask_to_bitmap(mask):
+    return int.from_bytes(np.packbits(np.asarray(mask, dtype=bool), bitorder="little").tobytes(), "little")
+
+
+def bitmap_to_rows(bits, n):
+    raw = np.frombuffer(bits.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little")[:n])
+
+
+class CohortIndex:
+    def __init__(self, phenotypes, tx_context=None, findings=True):
+        self.rows = phenotypes.reset_index(drop=True)
+        self.n = len(self.rows)
+        self.all = (1 << self.n) - 1
+        self.bitmaps = {}
+        self.finding_texts = {}
+        self._build(tx_context, findings)
+
+    def _build(self, tx_context, findings=True):
+        orgs = self.rows["organism"].to_numpy()
+        result_masks = {}
+        finding_masks = {}
+        for org in np.unique(orgs):
+            rows = np.flatnonzero(orgs == org)
+            self.bitmaps[("organism", org)] = mask_to_bitmap(orgs == org)
+            panel = ORGANISM_PANELS[org]
+            grid = np.ascontiguousarray(self.rows["phenotype"].to_numpy()[rows].astype(f"<U{len(panel)}"))
+            grid = grid.view("<U1").reshape(len(rows), len(panel))
+            for j, ab in enumerate(panel):
+                for code in "SIR":
+                    hit = rows[grid[:, j] == code]
+                    if len(hit):
+                        result_masks.setdefault((ab, code), []).append(hit)
+            if not findings:
+                continue
+            codes, uniques = np.unique(grid.view(f"<U{len(panel)}").ravel(), return_inverse=True)
+            for u, code in enumerate(codes):
+                sections = _interpret_encoded(org, str(code), _tx_context_key(org, tx_context))
+                hit = rows[uniques == u]
+                for kind, texts in zip(FINDING_KINDS, sections):
+                    for text in texts:
+                        label = finding_label(finding_id(text))
+                        self.finding_texts.setdefault(label, (kind, text))
+                        finding_masks.setdefault(label, []).append(hit)
+        for (ab, code), parts in result_masks.items():
+            self.bitmaps[("result", ab, code)] = self._from_rows(parts)
+        for label, parts in finding_masks.items():
+            self.bitmaps[("finding", label)] = self._from_rows(parts)
+
+    def _from_rows(self, parts):
+        mask = np.zeros(self.n, dtype=bool)
+        for rows in parts:
+            mask[rows] = True
+        return mask_to_bitmap(mask)
+
+    # ---------- primitives ----------
+    def bitmap(self, *key):
+        return self.bitmaps.get(key, 0)
+
+    def organisms(self, names):
+        bits = 0
+        for name in names:
+            for org in ORGANISM_GROUPS.get(name, [name]):
+                bits |= self.bitmap("organism", org)
+        return bits
+
+    def result(self, antibiotic, values):
+        ab = normalize_antibiotic(antibiotic) or antibiotic
+        bits = 0
+        for value in ([values] if isinstance(values, str) else values):
+            bits |= self.bitmap("result", ab, RESULT_CODES[normalize_result(value)])
+        return bits
+
+    def findings(self, pattern):
+        """OR of every finding whose label equals, or text matches (regex), pattern."""
+        if ("finding", pattern) in self.bitmaps:
+            return self.bitmaps[("finding", pattern)]
+        rx = re.compile(pattern, re.IGNORECASE)
+        bits = 0
+        for label, (_, text) in self.finding_texts.items():
+            if rx.search(text):
+                bits |= self.bitmaps[("finding", label)]
+        return bits
+
+    # ---------- queries ----------
+    def query(self, organisms=None, results=None, findings=None, exclude_findings=None):
+        """
+        AND of: any of `organisms` (names or ORGANISM_GROUPS keys); every
+        {antibiotic: result or [results]} in `results`; every pattern in
+        `findings`; none of `exclude_findings`. Returns a bitmap.
+        """
+        bits = self.all if not organisms else self.organisms(organisms)
+        for ab, values in (results or {}).items():
+            bits &= self.result(ab, values)
+        for pattern in findings or ():
+            bits &= self.findings(pattern)
+        for pattern in exclude_findings or ():
+            bits &= ~self.findings(pattern) & self.all
+        return bits
+
+    def count(self, bits):
+        return bits.bit_count()
+
+    def select(self, bits, limit=None):
+        idx = bitmap_to_rows(bits, self.n)
+        return self.rows.iloc[idx[:limit] if limit is not None else idx]
+
+    def query_spec(self, spec, limit=100):
+        """JSON-style query: {"organisms", "results", "findings", "exclude_findings"} -> count + first rows."""
+        bits = self.query(
+            spec.get("organisms"), spec.get("results"), spec.get("findings"), spec.get("exclude_findings")
+        )
+        rows = self.select(bits, limit)
+        return {
+            "count": self.count(bits),
+            # NaN (blank cells) -> None, so the result serializes as valid JSON
+            "rows": rows.astype(object).where(rows.notna(), None).to_dict(orient="records"),
+        }
+
+
+def build_index(path=COHORT_PATH, columns=None, tx_context=None, findings=True):
+    return CohortIndex(load_cohort(path, columns or cohort_columns()), tx_context, findings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the MechID cohort bitmap index")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--organism", action="append", default=[])
+    parser.add_argument("--group", action="append", default=[], choices=sorted(ORGANISM_GROUPS))
+    parser.add_argument("--result", action="append", default=[], help="Antibiotic=S|I|R (repeatable)")
+    parser.add_argument("--finding", action="append", default=[], help="finding label or text regex")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    index = build_index(args.cohort, cohort_columns(isolate=args.isolate_cols))
+    t1 = time.perf_counter()
+    results = dict(r.split("=", 1) for r in args.result)
+    out = index.query_spec(
+        {"organisms": args.organism + args.group, "results": results, "findings": args.finding}, args.limit
+    )
+    t2 = time.perf_counter()
+    print(json.dumps(out, indent=1, default=str))
+    print(f"index: {index.n} isolates, {len(index.bitmaps)} bitmaps, built in {t1 - t0:.2f}s; "
+          f"query {1000 * (t2 - t1):.2f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+MDR / XDR / PDR classification (Magiorakos et al., Clin Microbiol Infect 2012).
+
+    python mechid_mdr.py --cohort microbiology_cultures_cohort.csv --by organism,ward,period --period M
+
+Per organism group, MAGIORAKOS_CATEGORIES lists the antimicrobial categories and
+their agents. An isolate is non-susceptible to a category when any tested agent
+of it is I or R; agents the organism is intrinsically resistant to (RULES /
+intrinsic maps) are left out, and a category with no remaining panel agent does
+not apply. Over the applicable categories:
+
+  MDR  non-susceptible in >= 3 categories (S. aureus: also any MRSA)
+  XDR  MDR and non-susceptible in all but <= 2 categories
+  PDR  every applicable panel agent tested and non-susceptible
+
+MechID panels are narrower than the full Magiorakos agent lists, so XDR and PDR
+are relative to the agents the lab reports. Organisms outside the five groups
+get an empty class.
+
+Each organism's phenotypes are decoded into an (isolates x panel) grid once, and
+category status is a matrix product of the non-susceptible / tested masks with
+a (panel x category) membership mask, computed per distinct phenotype and
+gathered back to isolates.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_antibiogram import PERIODS, period_labels
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_dedup import first_isolate_flags
+from mechid_engine import ENTEROBACTERALES, ENTEROCOCCUS_ORGS, ORGANISM_PANELS, _organism_intrinsic
+
+_AMINOGLYCOSIDES = ["Gentamicin", "Tobramycin", "Amikacin", "Netilmicin"]
+_POLYMYXINS = ["Colistin", "Polymyxin B"]
+_TETRACYCLINES = ["Tetracycline", "Doxycycline", "Minocycline", "Tetracycline/Doxycycline"]
+
+MAGIORAKOS_CATEGORIES = {
+    "Enterobacterales": {
+        "Aminoglycosides": _AMINOGLYCOSIDES,
+        "Anti-MRSA cephalosporins": ["Ceftaroline"],
+        "Antipseudomonal penicillins + β-lactamase inhibitors": ["Piperacillin/Tazobactam", "Ticarcillin/Clavulanate"],
+        "Carbapenems": ["Ertapenem", "Imipenem", "Meropenem", "Doripenem"],
+        "Non-extended-spectrum cephalosporins": ["Cefazolin", "Cefuroxime"],
+        "Extended-spectrum cephalosporins": ["Cefotaxime", "Ceftriaxone", "Ceftazidime", "Cefepime"],
+        "Cephamycins": ["Cefoxitin", "Cefotetan"],
+        "Fluoroquinolones": ["Ciprofloxacin", "Levofloxacin"],
+        "Folate pathway inhibitors": ["Trimethoprim/Sulfamethoxazole"],
+        "Glycylcyclines": ["Tigecycline"],
+        "Monobactams": ["Aztreonam"],
+        "Penicillins": ["Ampicillin"],
+        "Penicillins + β-lactamase inhibitors": ["Amoxicillin/Clavulanate", "Ampicillin/Sulbactam"],
+        "Phenicols": ["Chloramphenicol"],
+        "Phosphonic acids": ["Fosfomycin"],
+        "Polymyxins": _POLYMYXINS,
+        "Tetracyclines": _TETRACYCLINES,
+    },
+    "Pseudomonas aeruginosa": {
+        "Aminoglycosides": _AMINOGLYCOSIDES,
+        "Antipseudomonal carbapenems": ["Imipenem", "Meropenem", "Doripenem"],
+        "Antipseudomonal cephalosporins": ["Ceftazidime", "Cefepime"],
+        "Antipseudomonal fluoroquinolones": ["Ciprofloxacin", "Levofloxacin"],
+        "Antipseudomonal penicillins + β-lactamase inhibitors": ["Piperacillin/Tazobactam", "Ticarcillin/Clavulanate"],
+        "Monobactams": ["Aztreonam"],
+        "Phosphonic acids": ["Fosfomycin"],
+        "Polymyxins": _POLYMYXINS,
+    },
+    "Acinetobacter": {
+        "Aminoglycosides": _AMINOGLYCOSIDES,
+        "Antipseudomonal carbapenems": ["Imipenem", "Meropenem", "Doripenem"],
+        "Antipseudomonal fluoroquinolones": ["Ciprofloxacin", "Levofloxacin"],
+        "Antipseudomonal penicillins + β-lactamase inhibitors": ["Piperacillin/Tazobactam", "Ticarcillin/Clavulanate"],
+        "Extended-spectrum cephalosporins": ["Cefotaxime", "Ceftriaxone", "Ceftazidime", "Cefepime"],
+        "Folate pathway inhibitors": ["Trimethoprim/Sulfamethoxazole"],
+        "Penicillins + β-lactamase inhibitors": ["Ampicillin/Sulbactam"],
+        "Polymyxins": _POLYMYXINS,
+        "Tetracyclines": _TETRACYCLINES,
+    },
+    "Staphylococcus aureus": {
+        "Aminoglycosides": ["Gentamicin"],
+        "Ansamycins": ["Rifampin"],
+        "Anti-MRSA cephalosporins": ["Ceftaroline"],
+        "Anti-staphylococcal β-lactams": ["Nafcillin/Oxacillin", "Cefoxitin"],
+        "Fluoroquinolones": ["Ciprofloxacin", "Moxifloxacin"],
+        "Folate pathway inhibitors": ["Trimethoprim/Sulfamethoxazole"],
+        "Fusidanes": ["Fusidic acid"],
+        "Glycopeptides": ["Vancomycin", "Teicoplanin", "Telavancin"],
+        "Glycylcyclines": ["Tigecycline"],
+        "Lincosamides": ["Clindamycin"],
+        "Lipopeptides": ["Daptomycin"],
+        "Macrolides": ["Erythromycin"],
+        "Oxazolidinones": ["Linezolid"],
+        "Phenicols": ["Chloramphenicol"],
+        "Phosphonic acids": ["Fosfomycin"],
+        "Streptogramins": ["Quinupristin/Dalfopristin"],
+        "Tetracyclines": _TETRACYCLINES,
+    },
+    "Enterococcus": {
+        "Aminoglycosides (except streptomycin)": ["High-level Gentamicin"],
+        "Streptomycin": ["High-level Streptomycin"],
+        "Carbapenems": ["Imipenem", "Meropenem", "Doripenem"],
+        "Fluoroquinolones": ["Ciprofloxacin", "Levofloxacin", "Moxifloxacin"],
+        "Glycopeptides": ["Vancomycin", "Teicoplanin"],
+        "Glycylcyclines": ["Tigecycline"],
+        "Lipopeptides": ["Daptomycin"],
+        "Oxazolidinones": ["Linezolid"],
+        "Penicillins": ["Ampicillin"],
+        "Streptogramins": ["Quinupristin/Dalfopristin"],
+        "Tetracyclines": _TETRACYCLINES,
+    },
+}
+MDR_CLASSES = ("MDR", "XDR", "PDR")
+MDR_GROUPINGS = ("organism", "ward", "period")
+MRSA_AGENTS = ("Nafcillin/Oxacillin", "Cefoxitin")
+
+
+def magiorakos_group(org):
+    if org in ENTEROBACTERALES:
+        return "Enterobacterales"
+    if org == "Pseudomonas aeruginosa":
+        return org
+    if org == "Acinetobacter baumannii complex":
+        return "Acinetobacter"
+    if org == "Staphylococcus aureus":
+        return org
+    if org in ENTEROCOCCUS_ORGS:
+        return "Enterococcus"
+    return None
+
+
+def category_mask(org):
+    """Returns (category names, bool mask panel x category) for the organism's applicable categories."""
+    group = magiorakos_group(org)
+    if group is None:
+        return [], np.zeros((len(ORGANISM_PANELS.get(org, [])), 0), dtype=bool)
+    panel = ORGANISM_PANELS[org]
+    intrinsic = _organism_intrinsic(org)
+    names, columns = [], []
+    for name, agents in MAGIORAKOS_CATEGORIES[group].items():
+        member = np.array([ab in agents and ab not in intrinsic for ab in panel], dtype=bool)
+        if member.any():
+            names.append(name)
+            columns.append(member)
+    return names, np.column_stack(columns) if columns else np.zeros((len(panel), 0), dtype=bool)
+
+
+def classify_codes(org, codes):
+    """
+    Classify encoded phenotypes of one organism.
+
+    Returns:
+      DataFrame (one row per code): mdr_class, categories, categories_tested,
+      categories_ns
+    """
+    codes = np.asarray(codes, dtype=object)
+    names, member = category_mask(org)
+    if not names:
+        return pd.DataFrame({"mdr_class": "", "categories": 0, "categories_tested": 0, "categories_ns": 0},
+                            index=range(len(codes)))
+    panel = ORGANISM_PANELS[org]
+    grid = np.ascontiguousarray(codes.astype(f"<U{len(panel)}")).view("<U1").reshape(len(codes), len(panel))
+    applicable = member.any(axis=1)
+    ns = (grid == "I") | (grid == "R")
+    tested = grid != "-"
+    m = member.astype(np.int32)
+    cat_ns = (ns.astype(np.int32) @ m) > 0
+    cat_tested = (tested.astype(np.int32) @ m) > 0
+    n_cat = member.shape[1]
+    n_ns = cat_ns.sum(axis=1)
+    mdr = n_ns >= 3
+    if org == "Staphylococcus aureus":
+        mrsa = [panel.index(ab) for ab in MRSA_AGENTS if ab in panel]
+        if mrsa:
+            mdr |= (grid[:, mrsa] == "R").any(axis=1)
+    xdr = mdr & (n_ns >= 3) & (n_ns >= n_cat - 2)
+    pdr = xdr & (ns | ~applicable).all(axis=1)
+    label = np.select([pdr, xdr, mdr], ["PDR", "XDR", "MDR"], "non-MDR")
+    return pd.DataFrame({
+        "mdr_class": label,
+        "categories": n_cat,
+        "categories_tested": cat_tested.sum(axis=1),
+        "categories_ns": n_ns,
+    })
+
+
+def classify_cohort(phenotypes):
+    """Phenotype matrix -> same rows plus mdr_class / categories / categories_tested / categories_ns."""
+    out = phenotypes.copy()
+    cols = {name: np.zeros(len(out), dtype=int) for name in ("categories", "categories_tested", "categories_ns")}
+    label = np.full(len(out), "", dtype=object)
+    for org, idx in out.groupby("organism", sort=False).indices.items():
+        codes, uniques = pd.factorize(out["phenotype"].to_numpy()[idx])
+        table = classify_codes(org, uniques)
+        label[idx] = table["mdr_class"].to_numpy()[codes]
+        for name in cols:
+            cols[name][idx] = table[name].to_numpy()[codes]
+    out["mdr_class"] = label
+    for name, values in cols.items():
+        out[name] = values
+    return out
+
+
+def mdr_counts(classified, by=("organism",), columns=None, period="M", first_isolate=True):
+    """
+    Isolate counts per group for the classified organisms.
+
+    `by` may name organism, ward and period (collection period, see
+    mechid_antibiogram.period_labels). With first_isolate, only the first
+    isolate per patient per organism (per period when grouping by period) counts.
+
+    Returns:
+      DataFrame: group columns, isolates, MDR, XDR, PDR, pct_MDR (MDR or higher)
+    """
+    cols = columns or cohort_columns()
+    rows = classified[classified["mdr_class"] != ""]
+    rows = rows.assign(
+        ward=rows[cols["ward"]].fillna("unknown") if cols["ward"] in rows else "unknown",
+        period=period_labels(pd.to_datetime(rows[cols["collected"]], errors="coerce"), period)
+        if cols["collected"] in rows else "unknown",
+    )
+    if first_isolate and cols["patient"] in rows and cols["collected"] in rows and len(rows):
+        rows = rows[first_isolate_flags(rows, cols["patient"], "organism", cols["collected"],
+                                        period="period" if "period" in by else None)]
+    by = list(by)
+    table = pd.crosstab([rows[c] for c in by], rows["mdr_class"])
+    for name in ("non-MDR", *MDR_CLASSES):
+        if name not in table:
+            table[name] = 0
+    table["isolates"] = table[["non-MDR", *MDR_CLASSES]].sum(axis=1)
+    table["pct_MDR"] = (100 * table[list(MDR_CLASSES)].sum(axis=1) / table["isolates"]).round(1)
+    return table[["isolates", *MDR_CLASSES, "pct_MDR"]].reset_index().rename_axis(None, axis=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MDR/XDR/PDR classification (Magiorakos 2012)")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--by", default="organism", help=f"comma-separated: {', '.join(MDR_GROUPINGS)}")
+    parser.add_argument("--period", choices=PERIODS, default="M")
+    parser.add_argument("--all-isolates", action="store_true", help="skip first-isolate deduplication")
+    parser.add_argument("--isolates", action="store_true", help="write per-isolate classes instead of counts")
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args(argv)
+    columns = cohort_columns(isolate=args.isolate_cols)
+    classified = classify_cohort(load_cohort(args.cohort, columns))
+    if args.isolates:
+        out = classified[classified["mdr_class"] != ""]
+    else:
+        out = mdr_counts(classified, [b.strip() for b in args.by.split(",")], columns, args.period,
+                         not args.all_isolates)
+    out.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
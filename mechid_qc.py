@@ -0,0 +1,203 @@
+"""
+AST consistency QC: impossible or improbable phenotypes for lab review.
+
+    python mechid_qc.py --cohort todays_rows.csv --out review.csv
+    python mechid_qc.py --cohort day1.csv day2.csv --summary
+
+Two kinds of checks run over the phenotype matrix:
+
+  intrinsic   an agent the organism is intrinsically resistant to (RULES,
+              enterococcus_intrinsic_map, anaerobe_intrinsic_map) reported S/I
+              -> severity "error"
+  QC_CHECKS   improbable combinations (beta-lactam hierarchy paradoxes such as
+              cephalosporin S with all carbapenems R, and resistance that CLSI
+              M100 asks to confirm before release, e.g. vancomycin-non-S
+              S. aureus) -> severity as listed ("error" or "review")
+
+A QC_CHECKS entry applies to its organisms and fires when all its clauses hold;
+a clause is (agents, result codes, quantifier, minimum tested):
+
+  "any"  at least one of the agents is reported with one of the codes
+  "all"  at least <minimum tested> of the agents are reported, all with one of
+         the codes
+
+Agents that are not on an organism's panel are ignored. Each distinct
+(organism, phenotype) is checked once on a character grid and the flags are
+gathered back to isolates, so a day's batch is checked in one vectorized pass.
+Flagged isolates are written with qc_severity ("error" before "review"),
+qc_checks and qc_detail (" | "-joined).
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_engine import ENTEROBACTERALES, ENTEROCOCCUS_ORGS, ORGANISM_PANELS, STAPH_ORGS, STREP_PANELS, _organism_intrinsic
+
+CARBAPENEMS = ("Ertapenem", "Imipenem", "Meropenem", "Doripenem")
+BROAD_CEPHALOSPORINS = ("Ceftriaxone", "Cefotaxime", "Ceftazidime", "Cefepime")
+SEVERITIES = ("error", "review")
+
+QC_CHECKS = [
+    {
+        "id": "ceph_S_carbapenems_R", "severity": "review", "organisms": sorted(ENTEROBACTERALES),
+        "when": [(CARBAPENEMS, "R", "all", 2), (BROAD_CEPHALOSPORINS, "S", "any", 1)],
+        "message": "3rd/4th-generation cephalosporin S while all tested carbapenems R",
+    },
+    {
+        "id": "ertapenem_S_meropenem_R", "severity": "review", "organisms": sorted(ENTEROBACTERALES),
+        "when": [(("Ertapenem",), "S", "any", 1), (("Meropenem",), "R", "any", 1)],
+        "message": "ertapenem S with meropenem R",
+    },
+    {
+        "id": "cefazolin_S_broad_ceph_R", "severity": "review", "organisms": sorted(ENTEROBACTERALES),
+        "when": [(("Cefazolin",), "S", "any", 1), (BROAD_CEPHALOSPORINS, "R", "any", 1)],
+        "message": "cefazolin S with a 3rd/4th-generation cephalosporin R",
+    },
+    {
+        "id": "ampicillin_S_bl_inhibitor_R", "severity": "review", "organisms": sorted(ENTEROBACTERALES),
+        "when": [(("Ampicillin",), "S", "any", 1), (("Ampicillin/Sulbactam", "Piperacillin/Tazobactam"), "R", "any", 1)],
+        "message": "ampicillin S with a beta-lactam/beta-lactamase inhibitor R",
+    },
+    {
+        "id": "oxacillin_R_penicillin_S", "severity": "error", "organisms": STAPH_ORGS,
+        "when": [(("Nafcillin/Oxacillin",), "R", "any", 1), (("Penicillin",), "S", "any", 1)],
+        "message": "oxacillin R with penicillin S (report penicillin R)",
+    },
+    {
+        "id": "vancomycin_NS_staphylococcus", "severity": "review", "organisms": STAPH_ORGS,
+        "when": [(("Vancomycin",), "IR", "any", 1)],
+        "message": "vancomycin non-susceptible Staphylococcus: confirm before release",
+    },
+    {
+        "id": "linezolid_R", "severity": "review", "organisms": STAPH_ORGS + ENTEROCOCCUS_ORGS,
+        "when": [(("Linezolid",), "R", "any", 1)],
+        "message": "linezolid R: confirm before release",
+    },
+    {
+        "id": "daptomycin_NS_enterococcus", "severity": "review", "organisms": ENTEROCOCCUS_ORGS,
+        "when": [(("Daptomycin",), "IR", "any", 1)],
+        "message": "daptomycin non-susceptible Enterococcus: confirm before release",
+    },
+    {
+        "id": "penicillin_S_ampicillin_R", "severity": "review", "organisms": ENTEROCOCCUS_ORGS,
+        "when": [(("Penicillin",), "S", "any", 1), (("Ampicillin",), "R", "any", 1)],
+        "message": "penicillin S with ampicillin R",
+    },
+    {
+        "id": "vancomycin_NS_streptococcus", "severity": "review", "organisms": list(STREP_PANELS),
+        "when": [(("Vancomycin",), "IR", "any", 1)],
+        "message": "vancomycin non-susceptible Streptococcus: confirm before release",
+    },
+    {
+        "id": "penicillin_NS_beta_hemolytic", "severity": "review", "organisms": ["β-hemolytic Streptococcus (GAS/GBS)"],
+        "when": [(("Penicillin",), "IR", "any", 1)],
+        "message": "penicillin non-susceptible beta-hemolytic Streptococcus: confirm before release",
+    },
+]
+
+
+def checks_for(org):
+    return [check for check in QC_CHECKS if org in check["organisms"]]
+
+
+def _grid(panel, codes):
+    return np.ascontiguousarray(codes.astype(f"<U{len(panel)}")).view("<U1").reshape(len(codes), len(panel))
+
+
+def _clause(grid, panel, agents, codes, quantifier, min_tested):
+    cols = [panel.index(ab) for ab in agents if ab in panel]
+    if not cols:
+        return np.zeros(len(grid), dtype=bool)
+    sub = grid[:, cols]
+    hit = np.isin(sub, list(codes))
+    if quantifier == "any":
+        return hit.any(axis=1)
+    tested = sub != "-"
+    return (tested.sum(axis=1) >= min_tested) & (hit == tested).all(axis=1)
+
+
+def qc_codes(org, codes):
+    """
+    Returns:
+      (severity, checks, detail) object arrays for the encoded phenotypes of one
+      organism; "" where nothing is flagged
+    """
+    codes = np.asarray(codes, dtype=object)
+    n = len(codes)
+    severity, checks, detail = (np.full(n, "", dtype=object) for _ in range(3))
+    panel = ORGANISM_PANELS.get(org)
+    if panel is None or not n:
+        return severity, checks, detail
+    grid = _grid(panel, codes)
+    hits = []  # (mask, severity, check id, message) in report order
+    for ab in sorted(_organism_intrinsic(org) & set(panel)):
+        col = grid[:, panel.index(ab)]
+        for code in "SI":
+            hits.append((col == code, "error", "intrinsic", f"{ab} reported {code} (intrinsically resistant)"))
+    for check in checks_for(org):
+        mask = np.ones(n, dtype=bool)
+        for clause in check["when"]:
+            mask &= _clause(grid, panel, *clause)
+        hits.append((mask, check["severity"], check["id"], check["message"]))
+    flagged = np.zeros(n, dtype=bool)
+    for mask, *_ in hits:
+        flagged |= mask
+    for i in np.flatnonzero(flagged):
+        found = [(sev, cid, msg) for mask, sev, cid, msg in hits if mask[i]]
+        severity[i] = min((sev for sev, _, _ in found), key=SEVERITIES.index)
+        checks[i] = " | ".join(dict.fromkeys(cid for _, cid, _ in found))
+        detail[i] = " | ".join(msg for _, _, msg in found)
+    return severity, checks, detail
+
+
+def qc_flags(phenotypes):
+    """Phenotype matrix -> qc_severity / qc_checks / qc_detail per isolate ("" when clean)."""
+    out = {name: np.full(len(phenotypes), "", dtype=object) for name in ("qc_severity", "qc_checks", "qc_detail")}
+    for org, idx in phenotypes.groupby("organism", sort=False).indices.items():
+        codes, uniques = pd.factorize(phenotypes["phenotype"].to_numpy()[idx])
+        for name, values in zip(out, qc_codes(org, uniques)):
+            out[name][idx] = values[codes]
+    return pd.DataFrame(out, index=phenotypes.index)
+
+
+def review_queue(phenotypes):
+    """
+    Returns:
+      flagged isolates with the QC columns, errors first (input order within
+      each severity)
+    """
+    rows = phenotypes.join(qc_flags(phenotypes))
+    rows = rows[rows["qc_severity"] != ""]
+    order = rows["qc_severity"].map(SEVERITIES.index)
+    return rows.iloc[np.argsort(order.to_numpy(), kind="stable")]
+
+
+def qc_summary(queue):
+    """Flagged isolates per organism and check."""
+    checks = queue[["organism", "qc_checks"]].assign(check=queue["qc_checks"].str.split(" | ", regex=False))
+    counts = checks.explode("check").groupby(["organism", "check"]).size()
+    return counts.rename("isolates").reset_index().sort_values("isolates", ascending=False, kind="stable")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AST consistency QC")
+    parser.add_argument("--cohort", nargs="+", default=[COHORT_PATH], help="batch file(s), e.g. one per day")
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--out", default="-", help="flagged isolates CSV")
+    parser.add_argument("--summary", action="store_true", help="print counts per organism and check to stderr")
+    args = parser.parse_args(argv)
+    columns = cohort_columns(isolate=args.isolate_cols)
+
+    pieces = [review_queue(load_cohort(path, columns)).assign(batch=path) for path in args.cohort]
+    queue = pd.concat(pieces, ignore_index=True)
+    queue.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+    print(queue["qc_severity"].value_counts().to_string(), file=sys.stderr)
+    if args.summary:
+        print(qc_summary(queue).to_string(index=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Local HTTP JSON service for the MechID engine.
+
+    python mechid_service.py serve --port 8765 --workers 4
+    python mechid_service.py serve-async --port 8765 --workers 2 --max-batch 64 --max-wait-ms 5
+    python mechid_service.py bench --url http://127.0.0.1:8765 --requests 5000 --concurrency 16
+
+Endpoints:
+  GET  /health
+  POST /interpret        {"organism": ..., "results": {...}, "context": {...}}
+  POST /interpret/batch  {"isolates": [{...}, ...]}
+                         (antibiotic names or LIS codes; names that cannot be
+                         mapped are returned in "unmapped")
+  POST /query            {"organisms": [...], "results": {"Ertapenem": "R"}, "findings": [...], "limit": 100}
+                         (only with `serve --cohort`; answered from the cohort bitmap index)
+  POST /mdr              {"by": ["organism", "ward", "period"], "period": "M", "first_isolate": true}
+                         (only with `serve --cohort`; MDR/XDR/PDR counts, see mechid_mdr)
+
+The engine is imported before the workers are forked, so every worker shares the
+registry pages with the parent and answers from its own warm memo cache.
+
+`serve-async` is an asyncio front end for burst load: concurrent requests are
+grouped into micro-batches (up to --max-batch isolates or --max-wait-ms) and
+identical in-flight isolates (same organism + results + context) share a single
+computation.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from mechid_engine import interpret_batch, interpret_isolate
+
+MAX_BODY_BYTES = 1 << 20      # 1 MiB per request
+MAX_BATCH_ISOLATES = 1000
+KEEPALIVE_TIMEOUT_S = 30
+
+
+class MechIDRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive by default
+    timeout = KEEPALIVE_TIMEOUT_S
+    server_version = "MechID"
+    disable_nagle_algorithm = True  # headers and body are written separately
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send_json(411, {"error": "Content-Length required"})
+            return None
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length"})
+            return None
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": f"Request body exceeds {MAX_BODY_BYTES} bytes"})
+            return None
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            self._send_json(400, {"error": f"Invalid JSON: {exc}"})
+            return None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "pid": os.getpid()})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path not in {"/interpret", "/interpret/batch", "/query", "/mdr"}:
+            self._send_json(404, {"error": "Not found"})
+            return
+        payload = self._read_json()
+        if payload is None:
+            return
+        if not isinstance(payload, dict):
+            self._send_json(400, {"error": "JSON object expected"})
+            return
+
+        if self.path == "/query":
+            if self.server.index is None:
+                self._send_json(404, {"error": "No cohort index loaded (start with --cohort)"})
+                return
+            try:
+                limit = int(payload.get("limit", 100))
+                if limit < 0:
+                    raise ValueError("'limit' must be >= 0")
+                result = self.server.index.query_spec(payload, min(limit, MAX_BATCH_ISOLATES))
+            except (ValueError, TypeError, KeyError, AttributeError, re.error) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            self._send_json(200, result)
+            return
+
+        if self.path == "/mdr":
+            if self.server.mdr is None:
+                self._send_json(404, {"error": "No cohort loaded (start with --cohort)"})
+                return
+            from mechid_mdr import MDR_GROUPINGS, mdr_counts
+            by = payload.get("by", ["organism"])
+            if not isinstance(by, list) or not by or not set(by) <= set(MDR_GROUPINGS):
+                self._send_json(400, {"error": f"'by' must be a non-empty list of {list(MDR_GROUPINGS)}"})
+                return
+            try:
+                table = mdr_counts(self.server.mdr, by, period=payload.get("period", "M"),
+                                   first_isolate=bool(payload.get("first_isolate", True)))
+            except (ValueError, TypeError, KeyError) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            self._send_json(200, {"rows": table.astype(object).where(table.notna(), None).to_dict(orient="records")})
+            return
+
+        if self.path == "/interpret":
+            try:
+                result = interpret_isolate(payload.get("organism"), payload.get("results"), payload.get("context"))
+            except (ValueError, TypeError, AttributeError) as exc:
+                self._send_json(400, {"error": str(exc)})
+                return
+            self._send_json(200, result)
+            return
+
+        isolates = payload.get("isolates")
+        if not isinstance(isolates, list):
+            self._send_json(400, {"error": "'isolates' must be a list"})
+            return
+        if len(isolates) > MAX_BATCH_ISOLATES:
+            self._send_json(413, {"error": f"Batch exceeds {MAX_BATCH_ISOLATES} isolates"})
+            return
+        self._send_json(200, {"results": list(interpret_batch(isolates))})
+
+
+class MechIDHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, verbose=False, index=None, mdr=None):
+        super().__init__(address, MechIDRequestHandler)
+        self.verbose = verbose
+        self.index = index
+        self.mdr = mdr
+
+
+def serve(host="127.0.0.1", port=8765, workers=None, verbose=False, cohort=None):
+    """Bind once, then fork `workers` processes that accept on the shared socket."""
+    workers = workers or os.cpu_count() or 1
+    index = mdr = None
+    if cohort:
+        # pandas/numpy are only needed for the cohort index; built before forking so workers share it
+        from mechid_index import build_index
+        from mechid_mdr import classify_cohort
+        index = build_index(cohort)
+        mdr = classify_cohort(index.rows)
+        print(f"Cohort index: {index.n} isolates, {len(index.bitmaps)} bitmaps", file=sys.stderr)
+    server = MechIDHTTPServer((host, port), verbose=verbose, index=index, mdr=mdr)
+    print(f"MechID service on http://{host}:{server.server_address[1]} ({workers} workers)", file=sys.stderr)
+
+    if workers == 1 or not hasattr(os, "fork"):
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        return
+
+    # Workers race on accept(); a non-blocking listener lets the losers go back to select().
+    server.socket.setblocking(False)
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def _shutdown(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        _shutdown()
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
+
+
+# ======================
+# asyncio front end: micro-batching + request coalescing
+# ======================
+def _interpret_chunk(isolates):
+    return list(interpret_batch(isolates))
+
+
+class MicroBatcher:
+    """Collects isolates from concurrent requests and interprets them in batches."""
+
+    def __init__(self, executor=None, max_batch=64, max_wait_ms=5.0):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.inflight = {}   # canonical isolate key -> future shared by identical requests
+        self.stats = {"isolates": 0, "coalesced": 0, "batches": 0}
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, isolate):
+        try:
+            key = json.dumps(isolate, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError) as exc:
+            return {"error": str(exc)}
+        self.stats["isolates"] += 1
+        fut = self.inflight.get(key)
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        self.inflight[key] = fut
+        await self.queue.put((key, isolate))
+        return await asyncio.shield(fut)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats["batches"] += 1
+            keys = [k for k, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, _interpret_chunk, [iso for _, iso in batch])
+            except Exception as exc:  # pool failure: fail the batch, keep serving
+                results = [{"error": f"Engine failure: {exc}"}] * len(batch)
+            for key, result in zip(keys, results):
+                fut = self.inflight.pop(key)
+                if not fut.done():
+                    fut.set_result(result)
+
+
+async def _handle_async_connection(reader, writer, batcher):
+    try:
+        while True:
+            request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT_S)
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode("latin-1").split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            status, payload = 404, {"error": "Not found"}
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                # the body cannot be framed, so the connection cannot be reused
+                status, payload, keep_alive = 400, {"error": "Invalid Content-Length"}, False
+            elif length > MAX_BODY_BYTES:
+                status, payload, keep_alive = 413, {"error": f"Request body exceeds {MAX_BODY_BYTES} bytes"}, False
+            else:
+                body = await reader.readexactly(length) if length else b""
+                if method == "GET" and path == "/health":
+                    status, payload = 200, {"status": "ok", "pid": os.getpid(), **batcher.stats}
+                elif method == "POST" and path in {"/interpret", "/interpret/batch"}:
+                    status, payload = await _dispatch_async(path, body, batcher)
+
+            out = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(out)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + out
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _dispatch_async(path, body, batcher):
+    try:
+        payload = json.loads(body or b"null")
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        return 400, {"error": f"Invalid JSON: {exc}"}
+    if not isinstance(payload, dict):
+        return 400, {"error": "JSON object expected"}
+    if path == "/interpret":
+        result = await batcher.submit(payload)
+        return (400 if "error" in result else 200), result
+    isolates = payload.get("isolates")
+    if not isinstance(isolates, list):
+        return 400, {"error": "'isolates' must be a list"}
+    if len(isolates) > MAX_BATCH_ISOLATES:
+        return 413, {"error": f"Batch exceeds {MAX_BATCH_ISOLATES} isolates"}
+    return 200, {"results": list(await asyncio.gather(*(batcher.submit(iso) for iso in isolates)))}
+
+
+def serve_async(host="127.0.0.1", port=8765, workers=1, max_batch=64, max_wait_ms=5.0):
+    """Single asyncio front end; batches go to a process pool (or a thread when workers=0)."""
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+
+    async def _main():
+        batcher = MicroBatcher(executor, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        batcher.start()
+        server = await asyncio.start_server(
+            lambda r, w: _handle_async_connection(r, w, batcher), host, port, backlog=512
+        )
+        print(
+            f"MechID async service on http://{host}:{port} "
+            f"(batch<={max_batch}, wait<={max_wait_ms} ms, {workers or 'in-process'} engine workers)",
+            file=sys.stderr,
+        )
+        stop = asyncio.Event()
+        if hasattr(signal, "SIGTERM"):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+            except NotImplementedError:
+                pass
+        async with server:
+            serving = asyncio.ensure_future(server.serve_forever())
+            await stop.wait()
+            serving.cancel()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+# ======================
+# Localhost load test
+# ======================
+BENCH_ISOLATE = {
+    "organism": "Escherichia coli",
+    "results": {"Ceftriaxone": "R", "Cefepime": "R", "Meropenem": "S", "Ertapenem": "R", "Ciprofloxacin": "R"},
+    "context": {"syndrome": "Bloodstream infection", "severity": "Non-severe"},
+}
+
+
+def bench(url, n_requests=2000, concurrency=8, batch_size=0):
+    """Keep-alive load test against a running service; returns throughput and latency percentiles."""
+    parts = urlsplit(url)
+    if batch_size:
+        path, body = "/interpret/batch", json.dumps({"isolates": [BENCH_ISOLATE] * batch_size}).encode()
+    else:
+        path, body = "/interpret", json.dumps(BENCH_ISOLATE).encode()
+    headers = {"Content-Type": "application/json"}
+    latencies, errors = [], []
+    lock = threading.Lock()
+    per_thread = [n_requests // concurrency + (i < n_requests % concurrency) for i in range(concurrency)]
+
+    def _worker(count):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local = []
+        for _ in range(count):
+            t0 = time.perf_counter()
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            local.append(time.perf_counter() - t0)
+            if resp.status != 200:
+                with lock:
+                    errors.append(resp.status)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=_worker, args=(c,)) for c in per_thread]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "isolates_per_s": round(len(latencies) * max(batch_size, 1) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(pct(0.50), 3),
+        "p99_ms": round(pct(0.99), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID local HTTP interpretation service")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_serve = sub.add_parser("serve", help="run the service")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--workers", type=int, default=None, help="pre-forked worker processes (default: CPU count)")
+    p_serve.add_argument("--verbose", action="store_true", help="log every request")
+    p_serve.add_argument("--cohort", default=None, help="cohort CSV to index for POST /query")
+
+    p_async = sub.add_parser("serve-async", help="run the asyncio micro-batching front end")
+    p_async.add_argument("--host", default="127.0.0.1")
+    p_async.add_argument("--port", type=int, default=8765)
+    p_async.add_argument("--workers", type=int, default=1, help="engine worker processes (0 = in-process thread)")
+    p_async.add_argument("--max-batch", type=int, default=64)
+    p_async.add_argument("--max-wait-ms", type=float, default=5.0)
+
+    p_bench = sub.add_parser("bench", help="load-test a running service on localhost")
+    p_bench.add_argument("--url", default="http://127.0.0.1:8765")
+    p_bench.add_argument("--requests", type=int, default=2000)
+    p_bench.add_argument("--concurrency", type=int, default=8)
+    p_bench.add_argument("--batch-size", type=int, default=0, help="use /interpret/batch with this many isolates")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "serve":
+        serve(args.host, args.port, args.workers, args.verbose, args.cohort)
+    elif args.cmd == "serve-async":
+        serve_async(args.host, args.port, args.workers, args.max_batch, args.max_wait_ms)
+    else:
+        print(json.dumps(bench(args.url, args.requests, args.concurrency, args.batch_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
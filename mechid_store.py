@@ -0,0 +1,280 @@
+"""
+Columnar results store.
+
+    python mechid_store.py build --cohort microbiology_cultures_cohort.csv --store mechid_store
+    python mechid_store.py count --store mechid_store --finding "ESBL pattern" \\
+        --organism "Klebsiella pneumoniae" --from 2024-07 --to 2024-09
+
+Layout (one directory per organism x collection month, numpy .npy columns):
+
+  <store>/manifest.json                     finding dictionary {label: {"text",
+                                             "kind"}}, therapy dictionary (list of
+                                             finding-label sets)
+  <store>/organism=<slug>/month=YYYY-MM/
+      meta.json                             organism, rows, finding labels present,
+                                             rules_version the partition was built with
+      isolate.npy / patient.npy / ward.npy  key columns (fixed-width unicode)
+      collected.npy                         datetime64[D]
+      phenotype.npy                         encoded phenotype (one char per panel agent)
+      therapy.npy                           int32 index into the therapy dictionary
+      F<finding id>.npy                     bool column per mechanism/banner/favorable finding
+
+Queries open only the partitions whose organism/month match and only the
+columns they need (memory-mapped), so counting a finding is a column scan
+rather than a re-run of the engine. Partitions are written to a temp directory
+and renamed into place.
+
+Appends only rewrite the partitions they cover, so a store can hold partitions
+built by different rules versions; `count` warns when the partitions it reads
+do, and `rules_versions` lists which partitions need a rebuild.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_engine import FINDING_KINDS, _interpret_encoded, _tx_context_key, finding_id, finding_label, rules_version
+from mechid_watch import atomic_write
+
+UNKNOWN_MONTH = "unknown"
+
+
+def org_slug(org):
+    return re.sub(r"[^A-Za-z0-9]+", "_", org).strip("_")
+
+
+def _unicode(values):
+    values = pd.Series(values).fillna("").astype(str).to_numpy()
+    width = max(1, max((len(v) for v in values), default=1))
+    return values.astype(f"<U{width}")
+
+
+class ResultsStore:
+    def __init__(self, path):
+        self.path = path
+        self.manifest = self._load_manifest()
+
+    # ---------- writing ----------
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.path, "manifest.json"), encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"organisms": {}, "findings": {}, "therapy": []}
+
+    def _save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+        atomic_write(
+            os.path.join(self.path, "manifest.json"),
+            json.dumps(self.manifest, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"),
+        )
+
+    def _encode_findings(self, org, codes, tx_context):
+        """Unique phenotypes -> (finding labels per phenotype, therapy dictionary index)."""
+        therapy_index = {tuple(t): i for i, t in enumerate(self.manifest["therapy"])}
+        labels, therapy = {}, {}
+        for code in codes:
+            sections = _interpret_encoded(org, code, _tx_context_key(org, tx_context))
+            found = set()
+            for kind, texts in zip(FINDING_KINDS[:3], sections[:3]):
+                for text in texts:
+                    label = finding_label(finding_id(text))
+                    self.manifest["findings"].setdefault(label, {"text": text, "kind": kind})
+                    found.add(label)
+            tx_labels = []
+            for text in sections[3]:
+                label = finding_label(finding_id(text))
+                self.manifest["findings"].setdefault(label, {"text": text, "kind": "therapy"})
+                tx_labels.append(label)
+            key = tuple(tx_labels)
+            if key not in therapy_index:
+                therapy_index[key] = len(self.manifest["therapy"])
+                self.manifest["therapy"].append(list(key))
+            labels[code], therapy[code] = found, therapy_index[key]
+        return labels, therapy
+
+    def _write_partition(self, org, month, rows, labels, therapy):
+        final = os.path.join(self.path, f"organism={org_slug(org)}", f"month={month}")
+        tmp = final + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        phenotypes = rows["phenotype"].to_numpy()
+        present = sorted(set().union(*(labels[c] for c in set(phenotypes))))
+        np.save(os.path.join(tmp, "phenotype.npy"), phenotypes.astype(f"<U{len(phenotypes[0])}"))
+        np.save(os.path.join(tmp, "therapy.npy"), rows["phenotype"].map(therapy).to_numpy(dtype=np.int32))
+        for name in ("isolate", "patient", "ward"):
+            if name in rows:
+                np.save(os.path.join(tmp, f"{name}.npy"), _unicode(rows[name]))
+        if "collected" in rows:
+            np.save(os.path.join(tmp, "collected.npy"), rows["collected"].to_numpy(dtype="datetime64[D]"))
+        # one bool column per finding: phenotype -> membership, gathered per distinct phenotype
+        codes, uniques = pd.factorize(rows["phenotype"])
+        for label in present:
+            member = np.array([label in labels[c] for c in uniques], dtype=bool)
+            np.save(os.path.join(tmp, f"{label}.npy"), member[codes])
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(
+                {"organism": org, "month": month, "rows": len(rows), "findings": present, "rules_version": rules_version()},
+                fh, ensure_ascii=False,
+            )
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(tmp, final)
+
+    def write(self, phenotypes, columns=None, tx_context=None):
+        """
+        Persist a phenotype matrix (mechid_cohort.cohort_phenotypes output),
+        replacing the organism/month partitions it covers.
+        """
+        cols = columns or cohort_columns()
+        frame = pd.DataFrame({
+            "organism": phenotypes["organism"],
+            "phenotype": phenotypes["phenotype"],
+        })
+        key = [c for c in cols["isolate"] if c in phenotypes]
+        if key:
+            frame["isolate"] = phenotypes[key[0]].astype(str).str.cat(
+                [phenotypes[k].astype(str) for k in key[1:]], sep="|"
+            ) if len(key) > 1 else phenotypes[key[0]].astype(str)
+        for name in ("patient", "ward"):
+            if cols[name] in phenotypes:
+                frame[name] = phenotypes[cols[name]]
+        if cols["collected"] in phenotypes:
+            frame["collected"] = pd.to_datetime(phenotypes[cols["collected"]], errors="coerce")
+            frame["month"] = frame["collected"].dt.strftime("%Y-%m").fillna(UNKNOWN_MONTH)
+        else:
+            frame["month"] = UNKNOWN_MONTH
+
+        written = 0
+        for org, org_rows in frame.groupby("organism", sort=True):
+            labels, therapy = self._encode_findings(org, org_rows["phenotype"].unique(), tx_context)
+            self.manifest["organisms"][org] = org_slug(org)
+            for month, rows in org_rows.groupby("month", sort=True):
+                self._write_partition(org, month, rows, labels, therapy)
+                written += len(rows)
+        self.manifest.pop("rules_version", None)  # now per partition (meta.json)
+        self._save_manifest()
+        return written
+
+    # ---------- reading ----------
+    def partitions(self, organism=None, start_month=None, end_month=None):
+        """Yield (organism, month, directory) for matching partitions."""
+        for org, slug in sorted(self.manifest["organisms"].items()):
+            if organism is not None and org != organism:
+                continue
+            base = os.path.join(self.path, f"organism={slug}")
+            if not os.path.isdir(base):
+                continue
+            for name in sorted(os.listdir(base)):
+                if not name.startswith("month=") or name.endswith(".tmp"):
+                    continue
+                month = name[len("month="):]
+                if (start_month or end_month) and month == UNKNOWN_MONTH:
+                    continue
+                if start_month and month < start_month or end_month and month > end_month:
+                    continue
+                yield org, month, os.path.join(base, name)
+
+    def find(self, pattern):
+        """Finding labels whose text matches a case-insensitive regex."""
+        rx = re.compile(pattern, re.IGNORECASE)
+        return [label for label, f in self.manifest["findings"].items() if rx.search(f["text"])]
+
+    def meta(self, directory):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        # partitions written before versions were kept per partition carry the store-wide one
+        meta.setdefault("rules_version", self.manifest.get("rules_version"))
+        return meta
+
+    def rules_versions(self, organism=None, start_month=None, end_month=None):
+        """
+        Returns:
+          {rules_version: [(organism, month), ...]} for matching partitions
+        """
+        out = {}
+        for org, month, directory in self.partitions(organism, start_month, end_month):
+            out.setdefault(self.meta(directory)["rules_version"], []).append((org, month))
+        return out
+
+    def column(self, directory, name):
+        path = os.path.join(directory, f"{name}.npy")
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def count(self, finding=None, organism=None, start_month=None, end_month=None):
+        """
+        Isolates per (organism, month) carrying any finding matching `finding`
+        (a label or text regex); all isolates when finding is None.
+        """
+        labels = None
+        if finding is not None:
+            labels = [finding] if finding in self.manifest["findings"] else self.find(finding)
+        out = {}
+        for org, month, directory in self.partitions(organism, start_month, end_month):
+            meta = self.meta(directory)
+            if labels is None:
+                n = meta["rows"]
+            else:
+                cols = [self.column(directory, label) for label in labels if label in meta["findings"]]
+                n = int(np.logical_or.reduce(cols).sum()) if cols else 0
+            if n:
+                out[(org, month)] = n
+        return out
+
+    def frame(self, organism=None, start_month=None, end_month=None, findings=()):
+        """Load matching partitions as a DataFrame (keys, phenotype, therapy notes, requested finding columns)."""
+        pieces = []
+        for org, month, directory in self.partitions(organism, start_month, end_month):
+            cols = {"organism": org, "month": month}
+            for name in ("isolate", "patient", "ward", "collected", "phenotype"):
+                col = self.column(directory, name)
+                if col is not None:
+                    cols[name] = np.asarray(col)
+            therapy = np.asarray(self.column(directory, "therapy"))
+            cols["therapy"] = [self.manifest["therapy"][i] for i in therapy]
+            for label in findings:
+                col = self.column(directory, label)
+                cols[label] = np.asarray(col) if col is not None else np.zeros(len(therapy), dtype=bool)
+            pieces.append(pd.DataFrame(cols))
+        return pd.concat(pieces, ignore_index=True) if pieces else pd.DataFrame()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID columnar results store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_build = sub.add_parser("build", help="interpret the cohort into the store")
+    p_build.add_argument("--cohort", default=COHORT_PATH)
+    p_build.add_argument("--store", default="mechid_store")
+    p_build.add_argument("--isolate-cols", default=None)
+    p_count = sub.add_parser("count", help="count isolates by organism/month")
+    p_count.add_argument("--store", default="mechid_store")
+    p_count.add_argument("--finding", default=None, help="finding label (Fxxxxxxxx) or text regex")
+    p_count.add_argument("--organism", default=None)
+    p_count.add_argument("--from", dest="start", default=None, help="YYYY-MM")
+    p_count.add_argument("--to", dest="end", default=None, help="YYYY-MM")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "build":
+        columns = cohort_columns(isolate=args.isolate_cols)
+        n = ResultsStore(args.store).write(load_cohort(args.cohort, columns), columns)
+        print(f"{n} isolates written to {args.store}", file=sys.stderr)
+    else:
+        store = ResultsStore(args.store)
+        counts = store.count(args.finding, args.organism, args.start, args.end)
+        versions = store.rules_versions(args.organism, args.start, args.end)
+        if len(versions) > 1 or versions and rules_version() not in versions:
+            for version, parts in versions.items():
+                print(f"warning: {len(parts)} partition(s) built with rules {version} "
+                      f"(engine is {rules_version()})", file=sys.stderr)
+        for (org, month), n in counts.items():
+            print(f"{org}\t{month}\t{n}")
+        print(f"total\t\t{sum(counts.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+DTR P. aeruginosa / CRAB / CRE surveillance.
+
+    python mechid_surveillance.py --cohort microbiology_cultures_cohort.csv --out positives.csv
+    python mechid_surveillance.py --cohort todays_rows.csv --state surveillance_state
+
+Definitions (applied to reported results only):
+  DTR-PA  P. aeruginosa non-susceptible (I/R) to every DTR_PA_AGENTS agent
+          (all must be tested), as in Kadri et al. 2018 / IDSA AMR guidance
+  CRAB    A. baumannii complex resistant to imipenem or meropenem
+  CRE     Enterobacterales resistant to any carbapenem (imipenem is not
+          counted for Proteeae, which have intrinsically raised imipenem MICs)
+
+Positives are reduced to one per patient per definition per episode: a new
+episode starts --episode-days after the previous counted positive
+(mechid_dedup, the same rule as first-isolate deduplication).
+
+With --state, each run is one batch of a feed: new positives are appended to
+<state>/alerts.jsonl and the per-(patient, definition) episode anchors are kept
+in <state>/episodes.npz (FirstIsolateStore), so a patient already alerted within
+the episode window is not alerted again. A late-arriving positive collected
+more than the episode window before the patient's last alert is an earlier
+episode and is alerted; one inside that window is suppressed. The checkpoint records the alert file
+size after each batch; alerts written after it (a crash between appending and
+checkpointing) are read back on start and suppressed when the batch is
+replayed, so a resent batch never produces a duplicate alert. Positives without
+a collection time are anchored at processing time.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_dedup import FirstIsolateStore, first_isolate_flags
+from mechid_engine import ENTEROBACTERALES, ORGANISM_PANELS
+from mechid_watch import atomic_write, load_checkpoint, save_checkpoint
+
+DTR_PA_AGENTS = (
+    "Piperacillin/Tazobactam", "Ceftazidime", "Cefepime", "Aztreonam",
+    "Meropenem", "Imipenem", "Ciprofloxacin", "Levofloxacin",
+)
+CRAB_AGENTS = ("Imipenem", "Meropenem")
+CRE_AGENTS = ("Ertapenem", "Imipenem", "Meropenem", "Doripenem")
+PROTEEAE = {"Proteus mirabilis", "Proteus vulgaris group", "Morganella morganii"}
+EPISODE_DAYS = 90
+ALERTS_NAME = "alerts.jsonl"
+EPISODES_NAME = "episodes.npz"
+
+
+def _grid(org, codes):
+    panel = ORGANISM_PANELS[org]
+    return panel, np.ascontiguousarray(codes.astype(f"<U{len(panel)}")).view("<U1").reshape(len(codes), len(panel))
+
+
+def _columns(panel, agents):
+    return [panel.index(ab) for ab in agents if ab in panel]
+
+
+def flag_codes(org, codes):
+    """Definition name (DTR-PA / CRAB / CRE) or "" for each encoded phenotype of one organism."""
+    codes = np.asarray(codes, dtype=object)
+    out = np.full(len(codes), "", dtype=object)
+    if org == "Pseudomonas aeruginosa":
+        panel, grid = _grid(org, codes)
+        cols = _columns(panel, DTR_PA_AGENTS)
+        if len(cols) == len(DTR_PA_AGENTS):
+            out[np.isin(grid[:, cols], ["I", "R"]).all(axis=1)] = "DTR-PA"
+    elif org == "Acinetobacter baumannii complex":
+        panel, grid = _grid(org, codes)
+        out[(grid[:, _columns(panel, CRAB_AGENTS)] == "R").any(axis=1)] = "CRAB"
+    elif org in ENTEROBACTERALES and org in ORGANISM_PANELS:
+        panel, grid = _grid(org, codes)
+        agents = [ab for ab in CRE_AGENTS if not (org in PROTEEAE and ab == "Imipenem")]
+        out[(grid[:, _columns(panel, agents)] == "R").any(axis=1)] = "CRE"
+    return out
+
+
+def surveillance_flags(phenotypes):
+    """Phenotype matrix -> definition per isolate ("" when none); one pass per distinct phenotype."""
+    flags = np.full(len(phenotypes), "", dtype=object)
+    for org, idx in phenotypes.groupby("organism", sort=False).indices.items():
+        codes, uniques = pd.factorize(phenotypes["phenotype"].to_numpy()[idx])
+        flags[idx] = flag_codes(org, uniques)[codes]
+    return pd.Series(flags, index=phenotypes.index, name="flag")
+
+
+def _isolate_key(rows, cols):
+    keys = [c for c in cols["isolate"] if c in rows]
+    if not keys:
+        return pd.Series(rows.index.astype(str), index=rows.index)
+    key = rows[keys[0]].astype(str)
+    for k in keys[1:]:
+        key = key + "|" + rows[k].astype(str)
+    return key + "|" + rows["organism"]
+
+
+def positives(phenotypes, columns=None, episode_days=EPISODE_DAYS):
+    """
+    Returns:
+      flagged isolates (one per patient per definition per episode) with
+      flag and isolate_key columns, in collection order
+    """
+    cols = columns or cohort_columns()
+    rows = phenotypes.assign(flag=surveillance_flags(phenotypes))
+    rows = rows[rows["flag"] != ""]
+    rows = rows.assign(isolate_key=_isolate_key(rows, cols))
+    if cols["patient"] in rows and cols["collected"] in rows and len(rows):
+        rows = rows[first_isolate_flags(rows, cols["patient"], "flag", cols["collected"], episode_days)]
+        rows = rows.sort_values(cols["collected"], kind="stable")
+    return rows
+
+
+def _alert_id(flag, patient, isolate_key):
+    return hashlib.sha1(f"{flag}\x1f{patient}\x1f{isolate_key}".encode("utf-8")).hexdigest()[:16]
+
+
+class SurveillanceMonitor:
+    """Streams new positives from successive batches to <state_dir>/alerts.jsonl."""
+
+    def __init__(self, state_dir, columns=None, episode_days=EPISODE_DAYS):
+        self.state_dir = state_dir
+        self.cols = columns or cohort_columns()
+        os.makedirs(state_dir, exist_ok=True)
+        self.alerts_path = os.path.join(state_dir, ALERTS_NAME)
+        self.episodes_path = os.path.join(state_dir, EPISODES_NAME)
+        self.checkpoint_path = os.path.join(state_dir, "checkpoint.json")
+        self.checkpoint = load_checkpoint(self.checkpoint_path) or {"alert_bytes": 0, "batches": 0}
+        self.episodes = (FirstIsolateStore.load(self.episodes_path)
+                         if os.path.exists(self.episodes_path) and self.checkpoint["batches"]
+                         else FirstIsolateStore(episode_days))
+        self.unconfirmed = self._recover()
+
+    def _recover(self):
+        """Alert IDs appended after the last checkpoint; a torn last line is cut off."""
+        if not os.path.exists(self.alerts_path):
+            return set()
+        with open(self.alerts_path, "r+b") as fh:
+            fh.seek(self.checkpoint["alert_bytes"])
+            tail = fh.read()
+            complete = tail[:tail.rfind(b"\n") + 1]
+            fh.truncate(self.checkpoint["alert_bytes"] + len(complete))
+        return {json.loads(line)["alert_id"] for line in complete.splitlines() if line.strip()}
+
+    def process(self, phenotypes, now=None):
+        """Flag a batch (phenotype matrix); returns the alerts emitted for it."""
+        cols = self.cols
+        rows = phenotypes.assign(flag=surveillance_flags(phenotypes))
+        rows = rows[rows["flag"] != ""]
+        alerts = []
+        if len(rows):
+            patient = rows[cols["patient"]].astype(str) if cols["patient"] in rows else _isolate_key(rows, cols)
+            collected = pd.to_datetime(rows[cols["collected"]], errors="coerce") \
+                if cols["collected"] in rows else pd.Series(pd.NaT, index=rows.index)
+            processed_at = pd.Timestamp(now if now is not None else time.time(), unit="s")
+            first = self.episodes.process(patient, rows["flag"], collected.fillna(processed_at))
+            hit = rows[first]
+            batch = pd.DataFrame({
+                "flag": hit["flag"].to_numpy(),
+                "organism": hit["organism"].to_numpy(),
+                "patient": patient[first].to_numpy(),
+                "isolate": _isolate_key(hit, cols).to_numpy(),
+                "collected": collected[first].map(lambda t: None if pd.isna(t) else t.isoformat()).to_numpy(),
+                "ward": hit[cols["ward"]].to_numpy() if cols["ward"] in hit else None,
+                "phenotype": hit["phenotype"].to_numpy(),
+            })
+            batch.insert(0, "alert_id", [_alert_id(*k) for k in zip(batch["flag"], batch["patient"], batch["isolate"])])
+            batch = batch[~batch["alert_id"].isin(self.unconfirmed)]
+            alerts = batch.astype(object).where(batch.notna(), None).to_dict(orient="records")
+        if alerts:
+            with open(self.alerts_path, "ab") as fh:
+                fh.write("".join(json.dumps(a, ensure_ascii=False) + "\n" for a in alerts).encode("utf-8"))
+                fh.flush()
+                os.fsync(fh.fileno())
+        self._commit()
+        return alerts
+
+    def _commit(self):
+        buf = io.BytesIO()
+        self.episodes.save(buf)
+        atomic_write(self.episodes_path, buf.getvalue())
+        self.checkpoint["alert_bytes"] = os.path.getsize(self.alerts_path) if os.path.exists(self.alerts_path) else 0
+        self.checkpoint["batches"] += 1
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+        self.unconfirmed = set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DTR-PA / CRAB / CRE surveillance")
+    parser.add_argument("--cohort", nargs="+", default=[COHORT_PATH], help="cohort file(s), processed in order")
+    parser.add_argument("--state", default=None, help="state directory: stream new positives to alerts.jsonl")
+    parser.add_argument("--episode-days", type=float, default=EPISODE_DAYS)
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--out", default="-", help="positives CSV (without --state)")
+    args = parser.parse_args(argv)
+    columns = cohort_columns(isolate=args.isolate_cols)
+
+    if args.state:
+        monitor = SurveillanceMonitor(args.state, columns, args.episode_days)
+        for path in args.cohort:
+            t0 = time.perf_counter()
+            alerts = monitor.process(load_cohort(path, columns))
+            print(json.dumps({"file": path, "alerts": len(alerts),
+                              "seconds": round(time.perf_counter() - t0, 3)}), file=sys.stderr)
+        return
+    phenotypes = pd.concat([load_cohort(path, columns) for path in args.cohort], ignore_index=True)
+    out = positives(phenotypes, columns, args.episode_days)
+    out.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+    print(out["flag"].value_counts().to_string(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Rule set of the legacy app (app.py): organism keys, intrinsic resistance and
+cascade rules, importable without Streamlit (e.g. by mechid_cascade validate).
+"""
+import pandas as pd
+
+# Rules supplied by the user
+USER_RULES = {
+    "ACINETOBACTER": {
+        "intrinsic_resistance": ["Aztreonam", "Cefazolin", "Minocycline", "Tetracycline"],
+        "cascade": [
+            {"target": "Doripenem", "rule": "same_as", "ref": "Meropenem"},
+            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
+            {"target": "Cefotaxime", "rule": "same_as", "ref": "Ceftriaxone"},
+            {"target": "Ertapenem", "rule": "sus_if_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},  # treat as any_sus over 2 refs
+            {"target": "Imipenem", "rule": "sus_if_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Meropenem", "rule": "sus_if_any_sus", "refs": ["Imipenem", "Ceftriaxone", "Cefotaxime"]},
+        ],
+    },
+    "CITROBACTER": {
+        "intrinsic_resistance": ["Ampicillin", "Cefazolin", "Cefotetan", "Cefoxitin"],
+        "cascade": [
+            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+        ],
+    },
+    "Enterobacter": {
+        "intrinsic_resistance": ["Ampicillin", "Cefazolin"],
+        "cascade": [
+            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
+            {"target": "Cefotaxime", "rule": "same_as", "ref": "Ceftriaxone"},
+            {"target": "Doxycycline", "rule": "sus_if_sus_else_res", "ref": "Tetracycline"},
+            {"target": "Doripenem", "rule": "same_as", "ref": "Meropenem"},
+            {"target": "Ertapenem", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Imipenem", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime"]},
+            {"target": "Meropenem", "rule": "sus_if_any_sus", "refs": ["Imipenem", "Ceftriaxone", "Cefotaxime"]},
+        ],
+    },
+    "ESCHERICHIA COLI": {
+        "intrinsic_resistance": [],
+        "cascade": [
+            {"target": "Cefepime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime", "Cefazolin"]},
+            {"target": "Ceftazidime", "rule": "sus_if_any_sus", "refs": ["Ceftriaxone", "Cefotaxime", "Cefazolin"]},
+            {"target": "Ceftriaxone", "rule": "same_as", "ref": "Cefotaxime"},
+            {"target": "Cefotetan", "rule": "sus_if_sus", "ref": "Cefazolin"},
+            {"target": "Cefoxitin", "rule": "sus_if_sus", "ref": "Cefazolin"},
+            {"target": "Cefpodoxime", "rule": "same_as_else_sus_if_sus", "primary": "Ceftriaxone", "fallback": "Cefazolin"},
+            {"target": "Cefuroxime", "rule": "sus_if_sus", "ref": "Cefazolin"},
+            {"target": "Doxycycline", "rule": "sus_if_sus_else_res", "ref": "Tetracycline"},
+        ],
+    },
+    "KLEBSIELLA": {
+        "intrinsic_resistance": ["Ampicillin"],
+        "cascade": [],
+    },
+    "Proteus species": {
+        "intrinsic_resistance": ["Tetracycline", "Tigecycline", "Colistin"],
+        "cascade": [],
+    },
+    "Pseudomonas aeruginosa": {
+        "intrinsic_resistance": ["Ampicillin", "Ceftriaxone", "Cefazolin", "Ertapenem", "Tetracycline", "Tigecycline"],
+        "cascade": [],
+    },
+    "Serratia": {
+        "intrinsic_resistance": ["Ampicillin", "Cefazolin", "Tetracycline"],
+        "cascade": [],
+    },
+}
+
+
+def normalize_org_name(name: str) -> str:
+    if pd.isna(name):
+        return name
+    n = name.strip()
+    if n.upper().startswith("ACINETOBACTER"):
+        return "ACINETOBACTER"
+    if n.upper().startswith("CITROBACTER"):
+        return "CITROBACTER"
+    if n.upper().startswith("ESCHERICHIA"):
+        return "ESCHERICHIA COLI"
+    if n.upper().startswith("KLEBSIELLA"):
+        return "KLEBSIELLA"
+    if n.upper().startswith("ENTEROBACTER"):
+        return "Enterobacter"
+    if n.upper().startswith("SERRATIA"):
+        return "Serratia"
+    if n.upper().startswith("PSEUDOMONAS"):
+        return "Pseudomonas aeruginosa"
+    if n.upper().startswith("PROTEUS"):
+        return "Proteus species"
+    return n
@@ -0,0 +1,255 @@
+"""
+Watch-folder ingestion with per-file checkpoints.
+
+    python mechid_watch.py --watch /data/lab_exports --out /data/mechid_out --interval 30
+    python mechid_watch.py --watch /data/lab_exports --out /data/mechid_out --once
+
+Every cycle scans the folder and reads only the bytes appended since the last
+checkpoint of each file:
+  - .jsonl / .ndjson : one isolate per line ({"organism", "results", "context"})
+  - .csv             : one isolate per row, an "organism" column plus one column
+                       per antibiotic (header remembered in the checkpoint)
+  - .hl7             : ORU^R01 messages (see mechid_hl7.py)
+
+Only complete units are consumed (lines up to the last newline; HL7 messages up
+to the next MSH, or the whole tail once the file has been idle for --settle
+seconds). Results for bytes [start, end) of a file go to
+<out>/<file>.<start>-<end>.jsonl, written to a temp file, fsynced and renamed;
+the checkpoint (<out>/checkpoint.json) is replaced the same way afterwards.
+The chosen end of the range is recorded in the checkpoint ("pending") before the
+output is written, so after a crash exactly the same range is reprocessed into
+the same output name even if the file has grown meanwhile, and a resumed run
+produces exactly the files an uninterrupted one would. A file whose
+inode changes or that shrinks below its offset is read again from the start.
+
+The standard library has no inotify binding, so the folder is polled with
+os.scandir (one stat per file per cycle).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from mechid_engine import interpret_batch
+from mechid_hl7 import iter_hl7_messages, parse_oru
+
+CHECKPOINT_NAME = "checkpoint.json"
+SUFFIXES = (".jsonl", ".ndjson", ".csv", ".hl7")
+SETTLE_S = 60.0
+MAX_READ_BYTES = 64 << 20
+
+
+# ======================
+# Atomic writes
+# ======================
+def atomic_write(path, data):
+    """Write bytes to path via a fsynced temp file in the same directory + rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, state):
+    atomic_write(path, json.dumps(state, indent=1, sort_keys=True).encode("utf-8"))
+
+
+# ======================
+# Complete units per format
+# ======================
+def _complete_lines(data, idle):
+    end = data.rfind(b"\n") + 1
+    if end == 0 and idle:
+        end = len(data)
+    return end
+
+
+def _complete_hl7(data, idle):
+    if idle:
+        return len(data)
+    # a message is complete once the next one has started
+    end = max(data.rfind(sep + b"MSH") for sep in (b"\r", b"\n", b"\x0b", b"\x1c"))
+    return end + 1 if end > 0 else 0
+
+
+def _isolates_jsonl(text, entry):
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            try:
+                iso = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield {"error": f"bad JSON line: {exc}"}
+                continue
+            yield iso if isinstance(iso, dict) else {"error": f"expected a JSON object, got {type(iso).__name__}"}
+
+
+def _isolates_csv(text, entry):
+    lines = text.splitlines()
+    if "header" not in entry:
+        if not lines:
+            return
+        entry["header"] = next(csv.reader([lines[0]]))
+        lines = lines[1:]
+    header = entry["header"]
+    lower = [h.strip().lower() for h in header]
+    if "organism" not in lower:
+        return
+    org_col = lower.index("organism")
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        yield {
+            "organism": row[org_col] if org_col < len(row) else None,
+            "results": {h: v for i, (h, v) in enumerate(zip(header, row)) if i != org_col and v.strip()},
+            "source_row": row,
+        }
+
+
+def _isolates_hl7(text, entry):
+    for message in iter_hl7_messages(io.StringIO(text)):
+        yield from parse_oru(message)
+
+
+FORMATS = {
+    ".jsonl": (_complete_lines, _isolates_jsonl),
+    ".ndjson": (_complete_lines, _isolates_jsonl),
+    ".csv": (_complete_lines, _isolates_csv),
+    ".hl7": (_complete_hl7, _isolates_hl7),
+}
+
+
+# ======================
+# One polling cycle
+# ======================
+def _output_name(out_dir, name, start, end):
+    return os.path.join(out_dir, f"{name}.{start}-{end}.jsonl")
+
+
+def _record(iso, interp, source):
+    if "error" in iso:
+        interp = {"error": iso["error"]}
+    record = {k: v for k, v in iso.items() if k not in {"results", "source_row", "error"}}
+    record.update({**source, **interp})
+    if "unmapped" in iso or "unmapped" in interp:
+        # parser-side (e.g. HL7 flags) and engine-side unmapped entries
+        record["unmapped"] = list(iso.get("unmapped", [])) + list(interp.get("unmapped", []))
+    return record
+
+
+def _process_range(path, entry, data, start, end, out_dir):
+    _, to_isolates = FORMATS[os.path.splitext(path)[1].lower()]
+    text = data[:end - start].decode("utf-8", errors="replace")
+    isolates = list(to_isolates(text, entry))
+    source = {"source": os.path.basename(path), "offset": [start, end]}
+    lines = []
+    for iso, interp in zip(isolates, interpret_batch(isolates)):
+        # one malformed record must not fail the range (it would be replayed forever)
+        try:
+            lines.append(json.dumps(_record(iso, interp, source), ensure_ascii=False))
+        except (TypeError, ValueError, AttributeError) as exc:
+            lines.append(json.dumps({**source, "error": f"bad record: {exc}"}, ensure_ascii=False))
+    atomic_write(
+        _output_name(out_dir, os.path.basename(path), start, end),
+        ("\n".join(lines) + "\n" if lines else "").encode("utf-8"),
+    )
+    return len(isolates)
+
+
+def run_once(watch_dir, out_dir, settle_s=SETTLE_S, now=None):
+    """Process new bytes of every watched file; returns per-cycle stats."""
+    now = time.time() if now is None else now
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_NAME)
+    state = load_checkpoint(checkpoint_path)
+    stats = {"files": 0, "bytes": 0, "isolates": 0}
+    with os.scandir(watch_dir) as it:
+        files = sorted((e for e in it if e.is_file() and e.name.lower().endswith(SUFFIXES)), key=lambda e: e.name)
+    for dirent in files:
+        st = dirent.stat()
+        entry = state.get(dirent.name)
+        if entry is None or entry["inode"] != st.st_ino or st.st_size < entry.get("pending", entry["offset"]):
+            entry = {"inode": st.st_ino, "offset": 0}
+        if st.st_size == entry["offset"]:
+            continue
+        complete, _ = FORMATS[os.path.splitext(dirent.name)[1].lower()]
+        with open(dirent.path, "rb") as fh:
+            fh.seek(entry["offset"])
+            data = fh.read(MAX_READ_BYTES)
+        if "pending" in entry:
+            # a crash after the range was chosen: replay exactly that range
+            end = entry["pending"]
+        else:
+            idle = now - st.st_mtime >= settle_s and entry["offset"] + len(data) == st.st_size
+            end = entry["offset"] + complete(data, idle)
+            if end == entry["offset"]:
+                continue
+            state[dirent.name] = {**entry, "pending": end}
+            save_checkpoint(checkpoint_path, state)
+        stats["isolates"] += _process_range(dirent.path, entry, data, entry["offset"], end, out_dir)
+        stats["files"] += 1
+        stats["bytes"] += end - entry["offset"]
+        entry.pop("pending", None)
+        entry["offset"] = end
+        state[dirent.name] = entry
+        save_checkpoint(checkpoint_path, state)
+    return stats
+
+
+def watch(watch_dir, out_dir, interval=30.0, settle_s=SETTLE_S):
+    os.makedirs(out_dir, exist_ok=True)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    while not stop.is_set():
+        stats = run_once(watch_dir, out_dir, settle_s)
+        if stats["files"]:
+            print(json.dumps(stats), file=sys.stderr, flush=True)
+        stop.wait(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID watch-folder ingestion")
+    parser.add_argument("--watch", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--interval", type=float, default=30.0)
+    parser.add_argument("--settle", type=float, default=SETTLE_S, help="seconds idle before a partial tail is consumed")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args(argv)
+    if args.once:
+        os.makedirs(args.out, exist_ok=True)
+        print(json.dumps(run_once(args.watch, args.out, args.settle)), file=sys.stderr)
+    else:
+        try:
+            watch(args.watch, args.out, args.interval, args.settle)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
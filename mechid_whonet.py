@@ -0,0 +1,266 @@
+"""
+WHONET export reader.
+
+    python mechid_whonet.py export.txt --out phenotypes.csv
+    python mechid_whonet.py export.txt --breakpoints breakpoints.csv --interpret --out interpreted.csv
+
+WHONET exports are wide tables: one row per isolate, an ORGANISM code column
+and one column per drug/method such as AMP_ND10 (ampicillin, CLSI disk 10 µg),
+CRO_NM (ceftriaxone, CLSI MIC) or CRO_EE (EUCAST Etest). Columns are mapped to
+MechID antibiotics once per file (normalize_antibiotic on the drug code),
+resolved against each organism's panel (panel_agent, so TCY/DOX fill
+"Tetracycline/Doxycycline" where the panel combines them), and each organism
+group is converted to the engine's encoded phenotype (one
+character per ORGANISM_PANELS position) with whole-column operations.
+
+Per agent, interpreted columns (S/I/R values) win over MIC, MIC over disk.
+Raw MIC/disk values are only interpreted when a breakpoint table is supplied
+(CSV: organism, antibiotic, method, s, r; organism "*" applies to all;
+MIC S if <= s and R if >= r, disk S if >= s and R if <= r). Values with
+comparators are moved one dilution outward (">16" -> 32, "<=0.25" stays 0.25,
+"<0.25" -> 0.125).
+"""
+import argparse
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mechid_engine import (
+    ORGANISM_PANELS,
+    normalize_antibiotic,
+    normalize_org,
+    panel_agent,
+)
+from mechid_cohort import interpret_matrix, per_unique
+
+# WHONET organism codes -> MechID organism names
+WHONET_ORGANISM_CODES = {
+    "eco": "Escherichia coli",
+    "kpn": "Klebsiella pneumoniae",
+    "kpn.pn": "Klebsiella pneumoniae",
+    "kox": "Klebsiella oxytoca",
+    "kae": "Klebsiella aerogenes",
+    "eae": "Klebsiella aerogenes",
+    "ecl": "Enterobacter cloacae complex",
+    "ecl-": "Enterobacter cloacae complex",
+    "cfr": "Citrobacter freundii complex",
+    "cfr-": "Citrobacter freundii complex",
+    "cko": "Citrobacter koseri",
+    "cdi": "Citrobacter koseri",
+    "sma": "Serratia marcescens",
+    "sal": "Salmonella enterica",
+    "pmi": "Proteus mirabilis",
+    "pvu": "Proteus vulgaris group",
+    "mmo": "Morganella morganii",
+    "aba": "Acinetobacter baumannii complex",
+    "acb-": "Acinetobacter baumannii complex",
+    "axy": "Achromobacter xylosoxidans",
+    "pae": "Pseudomonas aeruginosa",
+    "pma": "Stenotrophomonas maltophilia",
+    "efa": "Enterococcus faecalis",
+    "efm": "Enterococcus faecium",
+    "sau": "Staphylococcus aureus",
+    "slu": "Staphylococcus lugdunensis",
+    "scn": "Coagulase-negative Staphylococcus",
+    "sep": "Coagulase-negative Staphylococcus",
+    "spn": "Streptococcus pneumoniae",
+    "spy": "β-hemolytic Streptococcus (GAS/GBS)",
+    "sag": "β-hemolytic Streptococcus (GAS/GBS)",
+    "svi": "Viridans group streptococci (VGS)",
+    "bfr": "Bacteroides fragilis",
+    "cpe": "Clostridium perfringens",
+    "mtb": "Mycobacterium tuberculosis complex",
+    "mav": "Mycobacterium avium complex (MAC)",
+    "mka": "Mycobacterium kansasii",
+    "mab": "Mycobacterium abscessus complex",
+}
+
+# WHONET key columns -> MechID isolate keys
+WHONET_KEY_COLUMNS = {
+    "PATIENT_ID": "patient_id",
+    "SPEC_NUM": "specimen",
+    "SPEC_DATE": "collected",
+    "SPEC_TYPE": "specimen_type",
+    "WARD": "ward",
+}
+
+# CRO, CRO_NM, AMP_ND10, CRO_EE, AMP_ND10_I ...
+_DRUG_COLUMN = re.compile(r"^([A-Z]{3})(?:_([NE])([DME])(\d*(?:\.\d+)?))?(_I)?$")
+_METHODS = {"D": "disk", "M": "mic", "E": "mic"}
+_PRIORITY = {"interp": 0, "mic": 1, "disk": 2}
+_SIR = {"S": "S", "I": "I", "R": "R", "SDD": "I", "NS": "R"}
+
+
+def map_whonet_columns(columns):
+    """
+    Map WHONET drug columns to panel agents once per file.
+
+    Returns:
+      (mapped, unmapped): mapped is a list of (column, antibiotic, method) sorted
+      by agent then method priority; unmapped lists drug-like columns with no
+      panel agent.
+    """
+    mapped, unmapped = [], []
+    for col in columns:
+        m = _DRUG_COLUMN.match(str(col).strip().upper())
+        if not m or str(col).upper() in WHONET_KEY_COLUMNS or str(col).upper() == "ORGANISM":
+            continue
+        ab = normalize_antibiotic(m.group(1))
+        if ab is None:
+            if m.group(2):
+                unmapped.append(col)
+            continue
+        method = "interp" if (m.group(2) is None or m.group(5)) else _METHODS[m.group(3)]
+        mapped.append((col, ab, method))
+    mapped.sort(key=lambda x: (x[1], _PRIORITY[x[2]]))
+    return mapped, unmapped
+
+
+def map_whonet_organisms(codes):
+    """Vector of WHONET organism codes/names -> MechID organism names (None if unsupported)."""
+    def _org(code):
+        org = WHONET_ORGANISM_CODES.get(code.lower()) or normalize_org(code)
+        return org if org in ORGANISM_PANELS else None
+
+    return pd.Series(per_unique(codes, lambda c: _org(str(c).strip())), index=getattr(codes, "index", None))
+
+
+def load_breakpoints(path):
+    """Breakpoint CSV -> {(organism, antibiotic, method): (s, r)}."""
+    bp = pd.read_csv(path, dtype={"organism": str, "antibiotic": str, "method": str})
+    table = {}
+    for row in bp.itertuples(index=False):
+        ab = normalize_antibiotic(row.antibiotic) or row.antibiotic
+        org = row.organism if row.organism == "*" else normalize_org(row.organism)
+        table[(org, ab, row.method.strip().lower())] = (float(row.s), float(row.r))
+    return table
+
+
+def _measurement(text):
+    m = re.match(r"^([<>]?=?)\s*([0-9]*\.?[0-9]+)", text)
+    if not m:
+        return np.nan
+    value = float(m.group(2))
+    return value * 2 if m.group(1) == ">" else value / 2 if m.group(1) == "<" else value
+
+
+def _column_codes(values, method, breakpoint):
+    """Interpretations or measurements (already parsed) -> array of 'S'/'I'/'R'/''."""
+    if method == "interp":
+        return values
+    if breakpoint is None:
+        return np.full(len(values), "", dtype=object)
+    s, r = breakpoint
+    if method == "mic":
+        codes = np.where(values <= s, "S", np.where(values >= r, "R", "I"))
+    else:
+        codes = np.where(values >= s, "S", np.where(values <= r, "R", "I"))
+    return np.where(np.isnan(values), "", codes).astype(object)
+
+
+def _parse_column(values, method):
+    if method == "interp":
+        return per_unique(values, lambda v: _SIR.get(str(v).strip().upper(), ""), "")
+    return per_unique(values, lambda v: _measurement(str(v).strip()), np.nan).astype(float)
+
+
+def phenotype_matrix(frame, breakpoints=None):
+    """
+    WHONET frame -> one row per supported isolate with key columns, organism and
+    encoded phenotype.
+
+    Returns:
+      (phenotypes DataFrame, report dict)
+    """
+    breakpoints = breakpoints or {}
+    frame = frame.rename(columns=lambda c: str(c).strip())
+    upper = {str(c).upper(): c for c in frame.columns}
+    if "ORGANISM" not in upper:
+        raise ValueError("WHONET export has no ORGANISM column")
+    mapped, unmapped = map_whonet_columns(frame.columns)
+    orgs = map_whonet_organisms(frame[upper["ORGANISM"]])
+
+    keys = pd.DataFrame(index=frame.index)
+    for src, dst in WHONET_KEY_COLUMNS.items():
+        if src in upper:
+            keys[dst] = frame[upper[src]].astype("string")
+    keys["organism"] = orgs
+
+    # each column is parsed once for the whole file, then sliced per organism
+    parsed = {col: _parse_column(frame[col], method) for col, _, method in mapped}
+    pieces = []
+    no_breakpoint = set()
+    used = {}
+    for org, rows in keys.groupby("organism", sort=False).indices.items():
+        panel = ORGANISM_PANELS[org]
+        pos = {ab: i for i, ab in enumerate(panel)}
+        grid = np.full((len(rows), len(panel)), "-", dtype="<U1")
+        for col, ab, method in mapped:
+            agent = panel_agent(panel, ab)
+            if agent is None:
+                continue
+            used.setdefault(col, ab)
+            bp = breakpoints.get((org, ab, method)) or breakpoints.get(("*", ab, method))
+            if method != "interp" and bp is None:
+                no_breakpoint.add(col)
+            codes = _column_codes(parsed[col][rows], method, bp)
+            j = pos[agent]
+            fill = (grid[:, j] == "-") & (codes != "")
+            grid[fill, j] = codes[fill].astype("<U1")
+        # fixed-width rows -> one string per isolate
+        encoded = np.ascontiguousarray(grid).view(f"<U{len(panel)}").ravel()
+        pieces.append(keys.iloc[rows].assign(phenotype=encoded))
+
+    columns = [*keys.columns, "phenotype"]
+    out = pd.concat(pieces) if pieces else pd.DataFrame(columns=columns)
+    report = {
+        "rows": len(frame),
+        "isolates": len(out),
+        "unsupported_organism_rows": int(orgs.isna().sum()),
+        "mapped_columns": {col: ab for col, ab, _ in mapped if col in used},
+        # drug columns with no agent on the panel of any organism in the file
+        "unmapped_columns": unmapped + [col for col, _, _ in mapped if col not in used],
+        "columns_without_breakpoints": sorted(no_breakpoint),
+    }
+    return out.sort_index()[columns], report
+
+
+def read_whonet(path, breakpoints=None, sep=None):
+    """Read a WHONET export (tab-delimited .txt/.tsv or .csv) into a phenotype matrix."""
+    if sep is None:
+        sep = "\t" if path.lower().endswith((".txt", ".tsv")) else ","
+    frame = pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False, na_values=[""])
+    return phenotype_matrix(frame, breakpoints)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MechID WHONET export reader")
+    parser.add_argument("path")
+    parser.add_argument("--out", default="-")
+    parser.add_argument("--sep", default=None)
+    parser.add_argument("--breakpoints", default=None, help="CSV: organism,antibiotic,method,s,r")
+    parser.add_argument("--interpret", action="store_true")
+    parser.add_argument("--syndrome", default=None)
+    parser.add_argument("--severity", default=None)
+    args = parser.parse_args(argv)
+
+    breakpoints = load_breakpoints(args.breakpoints) if args.breakpoints else None
+    phenotypes, report = read_whonet(args.path, breakpoints, args.sep)
+    if args.interpret:
+        ctx = None
+        if args.syndrome or args.severity:
+            ctx = {"syndrome": args.syndrome or "Not specified", "severity": args.severity or "Not specified"}
+        phenotypes = interpret_matrix(phenotypes, ctx)
+    phenotypes.to_csv(sys.stdout if args.out == "-" else args.out, index=False)
+    print(
+        f"{report['isolates']} isolates from {report['rows']} rows; "
+        f"{len(report['mapped_columns'])} drug columns mapped, {len(report['unmapped_columns'])} unmapped, "
+        f"{len(report['columns_without_breakpoints'])} raw columns skipped (no breakpoints)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Weighted-incidence syndromic antibiogram (WISCA).
+
+    python mechid_wisca.py --cohort microbiology_cultures_cohort.csv \\
+        --syndrome "Bloodstream infection" --max-agents 2 --top 20
+    python mechid_wisca.py --cohort microbiology_cultures_cohort.csv \\
+        --organism "Pseudomonas aeruginosa" --syndrome "Pneumonia (HAP/VAP or severe CAP)" --target 0.9
+
+For a syndrome, the isolates whose specimen type matches SYNDROME_SPECIMENS
+(all isolates when the cohort has no specimen column or the syndrome has no
+specimen pattern) are reduced to the first isolate per patient per organism,
+and every candidate regimen (single agents and combinations) is scored:
+
+  coverage = sum over organisms k of  w_k * covered_k / evaluable_k
+
+  w_k          share of the syndrome's isolates that are organism k (incidence)
+  covered_k    isolates of k susceptible to at least one regimen agent
+  evaluable_k  isolates of k tested (or intrinsically resistant) against at
+               least one regimen agent; an agent not tested on an isolate
+               counts as not covering it
+
+Organisms with no evaluable isolate for a regimen (no agent on the organism's
+panel or never tested) count as not covered; their weight is reported as
+`unassessed`. With --draws, a Monte Carlo credible interval is added (Dirichlet
+incidence weights, Beta per-organism coverage) for the reported rows.
+
+Per agent and organism, the susceptible and tested isolates are Python-int
+bitsets (mechid_index.mask_to_bitmap), so scoring a regimen is a few ORs/ANDs
+and popcounts per organism; thousands of regimens score in well under a second.
+With --target, minimal_regimens searches for the smallest regimens (up to
+three agents) reaching that coverage instead of scoring every combination.
+"""
+import argparse
+import itertools
+import json
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from mechid_cohort import COHORT_PATH, cohort_columns, load_cohort
+from mechid_dedup import first_isolate_flags
+from mechid_engine import GNR_SYNDROMES, ORGANISM_PANELS, _organism_intrinsic, normalize_antibiotic
+from mechid_index import ORGANISM_GROUPS, mask_to_bitmap
+
+# syndrome -> specimen-type regex (case-insensitive); syndromes not listed use every isolate
+SYNDROME_SPECIMENS = {
+    "Uncomplicated cystitis": r"urin",
+    "Complicated UTI / pyelonephritis": r"urin|nephrost|kidney|renal",
+    "Bloodstream infection": r"blood",
+    "Pneumonia (HAP/VAP or severe CAP)": r"sputum|bronch|\bBAL\b|trache|endotrach|respir|lung|pleura",
+    "Intra-abdominal infection": r"perit|abdom|ascit|bile|biliar|liver|append|abscess",
+    "CNS infection": r"\bCSF\b|cerebro|spinal fluid|brain|ventric|shunt",
+    "Bone/joint infection": r"bone|joint|synov|osteo",
+}
+MAX_AGENTS = 2
+CREDIBLE_DRAWS = 0
+
+
+class CoverageModel:
+    """
+    Per-organism susceptible/tested bitsets for a set of isolates.
+
+    rows: phenotype matrix (organism, phenotype). Organisms are ordered by
+    incidence; bit i of an organism's bitsets is its i-th isolate.
+    """
+
+    def __init__(self, rows):
+        counts = rows["organism"].value_counts()
+        self.organisms = list(counts.index)
+        self.incidence = counts.to_numpy(dtype=float)
+        self.weights = self.incidence / self.incidence.sum() if len(counts) else self.incidence
+        self.full = [(1 << int(n)) - 1 for n in counts]
+        self.susceptible = {}   # agent -> {organism position: bitset}
+        self.tested = {}
+        for k, org in enumerate(self.organisms):
+            panel = ORGANISM_PANELS[org]
+            codes = rows.loc[rows["organism"] == org, "phenotype"].to_numpy().astype(f"<U{len(panel)}")
+            grid = np.ascontiguousarray(codes).view("<U1").reshape(len(codes), len(panel))
+            intrinsic = _organism_intrinsic(org)
+            for j, ab in enumerate(panel):
+                col = grid[:, j]
+                tested = col != "-"
+                if ab in intrinsic:
+                    tested = np.ones(len(col), dtype=bool)
+                elif not tested.any():
+                    continue
+                self.susceptible.setdefault(ab, {})[k] = mask_to_bitmap(col == "S")
+                self.tested.setdefault(ab, {})[k] = mask_to_bitmap(tested)
+        self.agents = sorted(self.tested)
+
+    def counts(self, regimen):
+        """Returns (covered, evaluable) isolate counts per organism position."""
+        covered = np.zeros(len(self.organisms), dtype=np.int64)
+        evaluable = np.zeros(len(self.organisms), dtype=np.int64)
+        positions = set()
+        for ab in regimen:
+            positions.update(self.tested.get(ab, ()))
+        for k in positions:
+            cov, any_tested = 0, 0
+            for ab in regimen:
+                if k in self.tested.get(ab, ()):
+                    cov |= self.susceptible[ab][k]
+                    any_tested |= self.tested[ab][k]
+            covered[k] = cov.bit_count()
+            evaluable[k] = any_tested.bit_count()
+        return covered, evaluable
+
+    def coverage(self, covered, evaluable):
+        """Returns (weighted coverage, unassessed weight)."""
+        assessed = evaluable > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            per_org = np.where(assessed, covered / np.maximum(evaluable, 1), 0.0)
+        return float(self.weights @ per_org), float(self.weights[~assessed].sum())
+
+    def credible_interval(self, covered, evaluable, draws, rng, level=0.95):
+        """Monte Carlo interval: Dirichlet(incidence + 1) weights x Beta(covered + 1, missed + 1)."""
+        assessed = evaluable > 0
+        w = rng.dirichlet(self.incidence + 1, size=draws)
+        p = rng.beta(covered + 1, evaluable - covered + 1, size=(draws, len(covered)))
+        sims = (w * np.where(assessed, p, 0.0)).sum(axis=1)
+        tail = (1 - level) / 2
+        return float(np.quantile(sims, tail)), float(np.quantile(sims, 1 - tail))
+
+    def score(self, regimens, draws=CREDIBLE_DRAWS, seed=0):
+        """
+        Returns:
+          DataFrame: regimen, agents, coverage, unassessed, evaluable (and
+          cr_low/cr_high with draws), best coverage first
+        """
+        out = []
+        for regimen in regimens:
+            covered, evaluable = self.counts(regimen)
+            cov, unassessed = self.coverage(covered, evaluable)
+            out.append((" + ".join(regimen), len(regimen), cov, unassessed, int(evaluable.sum()), covered, evaluable))
+        frame = pd.DataFrame(out, columns=["regimen", "agents", "coverage", "unassessed", "evaluable", "_c", "_e"])
+        frame = frame.sort_values(["coverage", "agents", "regimen"], ascending=[False, True, True], kind="stable")
+        if draws:
+            rng = np.random.default_rng(seed)
+            bounds = [self.credible_interval(c, e, draws, rng) for c, e in zip(frame["_c"], frame["_e"])]
+            frame["cr_low"] = [b[0] for b in bounds]
+            frame["cr_high"] = [b[1] for b in bounds]
+        return frame.drop(columns=["_c", "_e"]).reset_index(drop=True)
+
+
+def candidate_regimens(agents, max_agents=MAX_AGENTS):
+    """Every combination of 1..max_agents agents."""
+    for size in range(1, max_agents + 1):
+        yield from itertools.combinations(agents, size)
+
+
+def syndrome_rows(phenotypes, columns=None, syndrome="Not specified", start=None, end=None,
+                  organisms=None, first_isolate=True):
+    """
+    Isolates for a syndrome: specimen filter, collection-date range,
+    organism names/ORGANISM_GROUPS, then first isolate per patient per organism.
+    """
+    cols = columns or cohort_columns()
+    rows = phenotypes
+    pattern = SYNDROME_SPECIMENS.get(syndrome)
+    if pattern and cols["specimen"] in rows:
+        rows = rows[rows[cols["specimen"]].fillna("").str.contains(pattern, flags=re.IGNORECASE, regex=True)]
+    if (start or end) and cols["collected"] in rows:
+        when = pd.to_datetime(rows[cols["collected"]], errors="coerce")
+        keep = pd.Series(True, index=rows.index)
+        if start:
+            keep &= when >= pd.Timestamp(start)
+        if end:
+            keep &= when <= pd.Timestamp(end)
+        rows = rows[keep]
+    if organisms:
+        names = {org for name in organisms for org in ORGANISM_GROUPS.get(name, [name])}
+        rows = rows[rows["organism"].isin(names)]
+    if first_isolate and cols["patient"] in rows and cols["collected"] in rows and len(rows):
+        rows = rows[first_isolate_flags(rows, cols["patient"], "organism", cols["collected"])]
+    return rows
+
+
+def wisca(phenotypes, columns=None, syndrome="Not specified", agents=None, max_agents=MAX_AGENTS,
+          start=None, end=None, organisms=None, first_isolate=True, draws=CREDIBLE_DRAWS, top=None):
+    """Score every regimen of up to max_agents agents; returns (table, model)."""
+    model = CoverageModel(syndrome_rows(phenotypes, columns, syndrome, start, end, organisms, first_isolate))
+    pool = [normalize_antibiotic(a) or a for a in agents] if agents else model.agents
+    table = model.score(candidate_regimens(pool, max_agents))
+    if top:
+        table = table.head(top)
+    if draws and len(table):
+        # intervals only for the reported rows
+        chosen = [tuple(r.split(" + ")) for r in table["regimen"]]
+        table = model.score(chosen, draws=draws)
+    return table, model
+
+
+# ======================
+# Minimal-regimen search (branch and bound)
+# ======================
+TARGET_COVERAGE = 0.9
+SEARCH_MAX_AGENTS = 3
+
+
+def _coverage_bound(model, cov, evaluable, extra_cov):
+    """
+    Upper bound on the coverage of any regimen that adds agents from a pool to
+    the current one. Per organism, covered can grow at most to the OR with the
+    pool's susceptible bits, and isolates already evaluable but covered by no
+    pool agent stay evaluable-but-uncovered: bound = C / (C + X).
+    """
+    bound = 0.0
+    for k, w in enumerate(model.weights):
+        c_bits = cov[k] | extra_cov[k]
+        c = c_bits.bit_count()
+        if not c:
+            continue
+        x = (evaluable[k] & ~c_bits).bit_count()
+        bound += w * c / (c + x)
+    return bound
+
+
+def minimal_regimens(model, target=TARGET_COVERAGE, max_agents=SEARCH_MAX_AGENTS, agents=None):
+    """
+    Smallest regimens (1..max_agents agents) whose coverage reaches `target`.
+
+    Sizes are tried in increasing order and the search stops at the first size
+    with a hit, so every returned regimen is minimal. Within a size, agents are
+    taken in order of single-agent coverage; a prefix is pruned when
+    _coverage_bound over the agents after it cannot reach the target, and an
+    agent that changes neither the covered nor the evaluable isolates of the
+    prefix is skipped.
+
+    Returns:
+      (DataFrame as CoverageModel.score, stats dict: size, nodes, pruned, scored)
+    """
+    n_org = len(model.organisms)
+    pool = [normalize_antibiotic(a) or a for a in agents] if agents else list(model.agents)
+    pool = [ab for ab in pool if ab in model.tested]
+    pool = list(model.score([(ab,) for ab in pool])["regimen"])
+
+    zero = [0] * n_org
+    s_bits = [[model.susceptible[ab].get(k, 0) for k in range(n_org)] for ab in pool]
+    t_bits = [[model.tested[ab].get(k, 0) for k in range(n_org)] for ab in pool]
+    # suffix unions of susceptible bits, agents i..end
+    suffix_cov = [zero]
+    for i in range(len(pool) - 1, -1, -1):
+        suffix_cov.append([a | b for a, b in zip(suffix_cov[-1], s_bits[i])])
+    suffix_cov.reverse()
+
+    stats = {"size": None, "nodes": 0, "pruned": 0, "scored": 0}
+    for size in range(1, max_agents + 1):
+        found = []
+
+        def extend(prefix, start, cov, evaluable):
+            for j in range(start, len(pool) - (size - len(prefix)) + 1):
+                new_cov = [a | b for a, b in zip(cov, s_bits[j])]
+                new_evaluable = [a | b for a, b in zip(evaluable, t_bits[j])]
+                if prefix and new_cov == cov and new_evaluable == evaluable:
+                    continue
+                stats["nodes"] += 1
+                regimen = prefix + (pool[j],)
+                if len(regimen) == size:
+                    stats["scored"] += 1
+                    if model.coverage(*model.counts(regimen))[0] >= target:
+                        found.append(regimen)
+                elif _coverage_bound(model, new_cov, new_evaluable, suffix_cov[j + 1]) < target:
+                    stats["pruned"] += 1
+                else:
+                    extend(regimen, j + 1, new_cov, new_evaluable)
+
+        extend((), 0, zero, zero)
+        if found:
+            stats["size"] = size
+            return model.score(found), stats
+    return model.score([]), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Weighted-incidence syndromic antibiogram")
+    parser.add_argument("--cohort", default=COHORT_PATH)
+    parser.add_argument("--syndrome", default="Not specified", choices=GNR_SYNDROMES)
+    parser.add_argument("--agents", default=None, help="comma-separated candidate agents (default: all tested)")
+    parser.add_argument("--max-agents", type=int, default=None,
+                        help=f"default {MAX_AGENTS}, or {SEARCH_MAX_AGENTS} with --target")
+    parser.add_argument("--target", type=float, default=None,
+                        help="only the smallest regimens reaching this coverage (0-1), by branch and bound")
+    parser.add_argument("--organism", action="append", default=[], help="organism or group (repeatable)")
+    parser.add_argument("--from", dest="start", default=None, help="collected on/after (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default=None, help="collected on/before (YYYY-MM-DD)")
+    parser.add_argument("--all-isolates", action="store_true", help="skip first-isolate deduplication")
+    parser.add_argument("--draws", type=int, default=CREDIBLE_DRAWS, help="Monte Carlo draws for intervals")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--isolate-cols", default=None)
+    parser.add_argument("--specimen-col", default=None)
+    parser.add_argument("--out", default="-")
+    args = parser.parse_args(argv)
+
+    columns = cohort_columns(isolate=args.isolate_cols, specimen=args.specimen_col)
+    phenotypes = load_cohort(args.cohort, columns)
+    agents = args.agents.split(",") if args.agents else None
+    t0 = time.perf_counter()
+    if args.target is not None:
+        model = CoverageModel(syndrome_rows(
+            phenotypes, columns, args.syndrome, args.start, args.end, args.organism, not args.all_isolates
+        ))
+        table, stats = minimal_regimens(model, args.target, args.max_agents or SEARCH_MAX_AGENTS, agents)
+        table = table.head(args.top)
+        print(f"search: {json.dumps(stats)}", file=sys.stderr)
+    else:
+        table, model = wisca(
+            phenotypes, columns, args.syndrome, agents=agents, max_agents=args.max_agents or MAX_AGENTS,
+            start=args.start, end=args.end, organisms=args.organism, first_isolate=not args.all_isolates,
+            draws=args.draws, top=args.top,
+        )
+    t1 = time.perf_counter()
+    table.to_csv(sys.stdout if args.out == "-" else args.out, index=False, float_format="%.4f")
+    print(f"{args.syndrome}: {int(model.incidence.sum())} isolates, {len(model.organisms)} organisms, "
+          f"{len(model.agents)} agents; scored in {t1 - t0:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()